@@ -0,0 +1,143 @@
+import json
+import mmap
+import os
+
+import pygame
+
+
+# Directory holding all of the sprite images, next to this file so the game
+# can be started from any directory
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+# Sprite atlas files, made by build_atlas.py: the raw RGBA pixels of every
+# image packed together, and the index of where each image is
+ATLAS_PIXELS = 'atlas.rgba'
+ATLAS_INDEX = 'atlas.json'
+
+# Process-wide caches. Every image is decoded from disk once, and every mask is
+# built once, no matter how many sprites end up using them.
+_images = {}
+_masks = {}
+_rotations = {}
+_atlas = {}
+
+
+def load_atlas():
+    """
+    Load the sprite atlas, if it has been built.
+    The pixels are memory-mapped straight from the file, so nothing is decoded
+    and only the parts of the file that get used are read.
+
+    Returns:
+        dict: the region of each image in the atlas, as (x, y, width, height)
+            tuples. Empty if there is no atlas.
+    """
+    if 'regions' not in _atlas:
+        _atlas['regions'] = {}
+        index_path = os.path.join(ASSET_DIR, ATLAS_INDEX)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+            with open(os.path.join(ASSET_DIR, ATLAS_PIXELS), 'rb') as f:
+                pixels = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            # The surface reads straight from the mapped pixels, so keep them
+            _atlas['pixels'] = pixels
+            _atlas[False] = pygame.image.frombuffer(pixels, index['size'], 'RGBA')
+            _atlas['regions'] = {name: tuple(region)
+                                 for name, region in index['regions'].items()}
+    return _atlas['regions']
+
+
+def atlas_image(name, has_display):
+    """
+    Cut an image out of the sprite atlas.
+    Once there is a display, the whole atlas is converted to the display's
+    pixel format in one go, and images are cut out of the converted atlas.
+
+    Arguments:
+        name (str): file name of the image, without the '.png' extension
+        has_display (bool): whether or not a display has been set up
+
+    Returns:
+        pygame.Surface: subsurface of the atlas, or None if the image isn't
+            in the atlas
+    """
+    regions = load_atlas()
+    if name not in regions:
+        return None
+    if has_display not in _atlas:
+        _atlas[has_display] = _atlas[False].convert_alpha()
+    return _atlas[has_display].subsurface(regions[name])
+
+
+def load_image(name, angle=0):
+    """
+    Load a sprite image from the assets folder.
+    The first call cuts the image out of the sprite atlas (or decodes the PNG,
+    if the atlas hasn't been built), later calls hand out the same surface, so
+    callers must never draw onto the returned surface.
+
+    Images can be loaded before a display exists (e.g. when running headless).
+    They are converted to the display's pixel format for fast blitting the
+    first time they are requested once a display has been set up.
+
+    Arguments:
+        name (str): file name of the image, without the '.png' extension
+        angle (int): optional rotation (in degrees) to apply to the image
+
+    Returns:
+        pygame.Surface: the shared image surface
+    """
+    key = (name, angle)
+    image, converted = _images.get(key, (None, False))
+    has_display = pygame.display.get_surface() is not None
+    if image is None or (has_display and not converted):
+        if angle == 0:
+            image = atlas_image(name, has_display)
+            if image is None:
+                path = os.path.join(ASSET_DIR, name + '.png')
+                image = pygame.image.load(path)
+                if has_display:
+                    image = image.convert_alpha()
+        else:
+            image = pygame.transform.rotate(load_image(name), angle)
+        _images[key] = (image, has_display)
+    return image
+
+
+def load_mask(name, angle=0):
+    """
+    Get the collision mask for a sprite image.
+
+    Arguments:
+        name (str): file name of the image, without the '.png' extension
+        angle (int): optional rotation (in degrees) to apply to the image
+
+    Returns:
+        pygame.mask.Mask: the shared mask
+    """
+    key = (name, angle)
+    if key not in _masks:
+        _masks[key] = pygame.mask.from_surface(load_image(name, angle))
+    return _masks[key]
+
+
+def load_rotations(names, angles):
+    """
+    Get a table of pre-rotated images and masks.
+    Rotating a sprite every frame allocates a new surface, so sprites that 
+    only ever take a few angles should look them up here instead.
+
+    Arguments:
+        names (list): file names of the images, without the '.png' extension
+        angles (list): rotations (in degrees) to build for every image
+
+    Returns:
+        list: for each name, a dict mapping each angle to (image, mask)
+    """
+    has_display = pygame.display.get_surface() is not None
+    key = (tuple(names), tuple(angles), has_display)
+    if key not in _rotations:
+        _rotations[key] = [{angle: (load_image(name, angle), load_mask(name, angle))
+                            for angle in angles} for name in names]
+    return _rotations[key]
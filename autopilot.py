@@ -0,0 +1,386 @@
+"""
+Autopilot: plays the game by searching over every position and velocity the
+bird can reach, and checks whether courses can be survived at all.
+
+The bird's flight is fully deterministic: a flap sets its velocity and tilt,
+and otherwise both change by a fixed amount each frame. So the bird's state
+comes down to its (whole pixel) height and its "phase", i.e. its (velocity,
+angle) pair, of which there are only a few dozen. Collisions with the pipes
+and base are worked out for every state at once, pixel exact, with the same
+summed area tables as the batch simulation, and a dynamic programming pass
+over the upcoming frames finds how long each state can survive.
+
+The bird is kept on screen: the game lets it fly above the top of the screen,
+and over the pipes, which would make every course trivially survivable.
+
+Usage:
+    python autopilot.py [--seeds 100] [--pipes 100]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+# Keep pygame's banner out of the JSON output
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+
+from bird import Bird
+from base import Base
+from assets import load_image
+from batch import sprite_tables
+from collision import pipe_rects
+from simulation import Simulation
+
+
+def trajectory_tables(bird):
+    """
+    Get every phase the bird can be in, and how the phases follow each other.
+
+    Starting from the bird's state at the start of game play, the bird's
+    rules (see Bird.update_angle and Bird.update_velocity) are applied with
+    and without a flap until no new phases turn up.
+
+    Arguments:
+        bird (Bird): a bird, to take the rules from
+
+    Returns:
+        tuple: (velocity, angle, after). velocity and angle hold the
+            velocity and angle of each phase, and after[phase, flap] is the
+            phase the bird is in after the next frame.
+    """
+    def advance(velocity, angle, flap):
+        if flap:
+            return bird.velocity_flap, bird.angle_flap
+        return (min(velocity + 1, bird.velocity_terminal),
+                max(angle - bird.rate_of_rotation, bird.angle_threshold))
+
+    phases = [(bird.velocity_y, bird.angle)]
+    index = {phases[0]: 0}
+    after = []
+    i = 0
+    while i < len(phases):
+        row = []
+        for flap in (False, True):
+            phase = advance(*phases[i], flap)
+            if phase not in index:
+                index[phase] = len(phases)
+                phases.append(phase)
+            row.append(index[phase])
+        after.append(row)
+        i += 1
+    velocity, angle = np.array(phases).T
+    return velocity, angle, np.array(after)
+
+
+class Autopilot():
+
+    def __init__(self, width=288, height=512, horizon=60):
+        """
+        Initialize an autopilot.
+
+        Each frame, it looks ahead over the pipes already on screen, and
+        flaps only if that lets the bird survive for longer. The lookahead
+        stops at the pipes that haven't been placed yet, which the autopilot
+        can't know about.
+
+        The autopilot is a policy for Game.main_loop() and tournament.py:
+        call it with the simulation, and it returns whether or not to flap.
+
+        Arguments:
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+            horizon (int): number of frames to look ahead
+        """
+        self.width, self.height = width, height
+        self.horizon = horizon
+
+        bird = Bird(0.2*width, 0.45*height)
+        base = Base(width, height)
+        self.bird_x = int(bird.x)
+        self.pipe_width = load_image('pipe').get_width()
+
+        # Phases of the bird (see trajectory_tables), and the sprite angle of
+        # each phase as an index into self.angles
+        self.velocity, angle, self.after = trajectory_tables(bird)
+        self.phase_index = {(v, a): p for p, (v, a) in enumerate(zip(self.velocity.tolist(),
+                                                                     angle.tolist()))}
+        self.angles, self.phase_angle = np.unique(angle, return_inverse=True)
+
+        # Bird sprites, by flap state and angle (see batch.sprite_tables)
+        _, self.sprite_index, self.sprite_size, self.sprite_sat = sprite_tables(bird)
+        self.flap_cycle = len(bird.im_cycle)
+
+        # Heights the bird can be at (in whole pixels): from the top of the
+        # screen down to the base
+        self.num_heights = base.y
+        num_states = len(self.velocity) * self.num_heights
+
+        # The state after each state with and without a flap, as flat indices
+        # into (phase, height) arrays. States that leave the screen point
+        # past the end, at an extra dead state.
+        phase = np.repeat(np.arange(len(self.velocity)), self.num_heights)
+        y = np.tile(np.arange(self.num_heights), len(self.velocity))
+        self.successors = []
+        for flap in (0, 1):
+            next_phase = self.after[phase, flap]
+            next_y = y + self.velocity[next_phase]
+            inside = (next_y >= 0) & (next_y < self.num_heights)
+            self.successors.append(np.where(inside, next_phase * self.num_heights + next_y,
+                                            num_states))
+
+        # Collisions with the base, by sprite and height. The base always
+        # spans the whole screen, so only the height matters.
+        sprites = np.arange(len(self.sprite_size))
+        self.base_hits = self.hits(sprites, base.solid_rects())
+
+        # Collisions with pipe pairs, by where the pipe pair is and the flap
+        # state (see pipe_hits)
+        self.pipe_cache = {}
+
+
+    def hits(self, sprites, rects):
+        """
+        Check sprites at every height against solid rectangles.
+
+        Arguments:
+            sprites (np.ndarray): sprite indices
+            rects (list): (x0, y0, x1, y1) rectangles in screen coordinates
+
+        Returns:
+            np.ndarray: (len(sprites), num_heights) boolean array, True where
+                the sprite at that height hits a rectangle
+        """
+        sat = self.sprite_sat
+        w = self.sprite_size[sprites, 0, None]
+        h = self.sprite_size[sprites, 1, None]
+        s = sprites[:, None]
+        y = np.arange(self.num_heights)
+        hit = np.zeros((len(sprites), self.num_heights), dtype=bool)
+        for x0, y0, x1, y1 in rects:
+            # Move the rectangle into each sprite's frame and clip it
+            cx0 = np.clip(x0 - self.bird_x, 0, w)
+            cx1 = np.clip(x1 - self.bird_x, 0, w)
+            if not (cx0 < cx1).any():
+                continue
+            cy0 = np.clip(y0 - y, 0, h)
+            cy1 = np.clip(y1 - y, 0, h)
+            hit |= (sat[s, cy1, cx1] - sat[s, cy0, cx1]
+                    - sat[s, cy1, cx0] + sat[s, cy0, cx0]) > 0
+        return hit
+
+
+    def pipe_hits(self, x, top, gap_top, gap_bottom, flap_state):
+        """
+        Check the bird at every angle and height against a pipe pair. Results
+        are cached, since the same pipe pair comes up again frame after frame.
+
+        Arguments:
+            x (int): x-coordinate of the pipe pair
+            top (int): y-coordinate of the top of the pipe pair
+            gap_top (int): y-coordinate of the top of the gap
+            gap_bottom (int): y-coordinate of the bottom of the gap
+            flap_state (int): the bird's flap state
+
+        Returns:
+            np.ndarray: (len(angles), num_heights) boolean array
+        """
+        key = (x, top, gap_top, gap_bottom, flap_state)
+        if key not in self.pipe_cache:
+            if len(self.pipe_cache) > 10000:
+                self.pipe_cache.clear()
+            sprites = self.sprite_index[flap_state, self.angles]
+            rects = pipe_rects(x, top, top + self.height, gap_top, gap_bottom)
+            self.pipe_cache[key] = self.hits(sprites, rects)
+        return self.pipe_cache[key]
+
+
+    def frame_hits(self, pipes, flap_state):
+        """
+        Check every state against the pipes and the base on one frame.
+
+        Arguments:
+            pipes (list): (x, top, gap_top, gap_bottom) of each pipe pair
+            flap_state (int): the bird's flap state on this frame
+
+        Returns:
+            np.ndarray: flat boolean array over the (phase, height) states,
+                True where the bird crashes
+        """
+        sprites = self.sprite_index[flap_state, self.angles]
+        hit = self.base_hits[sprites]
+        for x, top, gap_top, gap_bottom in pipes:
+            # Skip pipe pairs that are nowhere near the bird
+            if x < self.bird_x + self.sprite_size[:, 0].max() and x + self.pipe_width > self.bird_x:
+                hit = hit | self.pipe_hits(x, top, gap_top, gap_bottom, flap_state)
+        return hit[self.phase_angle].ravel()
+
+
+    def state(self, bird):
+        """
+        Get the (phase, height) state of a bird.
+
+        Arguments:
+            bird (Bird): the bird
+
+        Returns:
+            int: flat index of the state
+        """
+        phase = self.phase_index[(bird.velocity_y, bird.angle)]
+        y = min(max(int(bird.y), 0), self.num_heights - 1)
+        return phase * self.num_heights + y
+
+
+    def flap_states(self, bird, frames):
+        """
+        Get the bird's flap state over the next frames (see Bird.update).
+
+        Arguments:
+            bird (Bird): the bird
+            frames (int): number of frames
+
+        Returns:
+            list: the flap state on each frame, starting with the current one
+        """
+        states = [bird.flap_state]
+        for count in range(bird.count, bird.count + frames - 1):
+            states.append(count % self.flap_cycle if count % 5 == 0 else states[-1])
+        return states
+
+
+    def plan(self, sim):
+        """
+        Look ahead and work out how long the bird can survive with and
+        without flapping now.
+
+        Arguments:
+            sim (Simulation): the game, in game play
+
+        Returns:
+            tuple: (frames survived without a flap, frames survived with one),
+                up to the horizon
+        """
+        bird = sim.player
+        pipes = [(pipe.x, pipe.y, pipe.gap_top, pipe.gap_bottom) for pipe in sim.pipes]
+        flap_states = self.flap_states(bird, self.horizon)
+
+        # Number of frames each state survives for, from the horizon back to
+        # the next frame. The extra last entry is the dead state.
+        survival = np.zeros(len(self.successors[0]) + 1, dtype=np.int32)
+        for t in range(self.horizon - 1, 0, -1):
+            on_frame = [(int(x) - 4*t, top, gap_top, gap_bottom)
+                        for x, top, gap_top, gap_bottom in pipes]
+            best = np.maximum(survival[self.successors[0]], survival[self.successors[1]])
+            survival[:-1] = np.where(self.frame_hits(on_frame, flap_states[t]), 0, best + 1)
+
+        state = self.state(bird)
+        return (int(survival[self.successors[0][state]]),
+                int(survival[self.successors[1][state]]))
+
+
+    def __call__(self, sim):
+        """
+        Decide whether or not to flap.
+
+        Arguments:
+            sim (Simulation): the game, in game play
+
+        Returns:
+            bool: True to flap
+        """
+        without_flap, with_flap = self.plan(sim)
+        return with_flap > without_flap
+
+
+    def survivable(self, seed, pipes=100, level=2, difficulty=None):
+        """
+        Check whether a course can be survived at all, by tracking every state
+        the bird could be in, frame by frame, over the whole course. The bird
+        starts where it is when game play starts straight away.
+
+        Arguments:
+            seed (int): seed of the course
+            pipes (int): number of pipes to get through
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            difficulty (callable): optional difficulty curve (see Simulation)
+
+        Returns:
+            int: number of pipes the best possible player gets through, up to
+                pipes. The course is survivable if this is pipes.
+        """
+        sim = Simulation(self.width, self.height, level, random.Random(seed), difficulty)
+        sim.start()
+        bird = sim.player
+
+        reachable = np.zeros(len(self.successors[0]) + 1, dtype=bool)
+        reachable[self.state(bird)] = True
+        flap_state, count = bird.flap_state, bird.count
+        score = 0
+        while score < pipes:
+            on_frame = [(int(pipe.x), pipe.y, pipe.gap_top, pipe.gap_bottom)
+                        for pipe in sim.pipes]
+            reachable[:-1] &= ~self.frame_hits(on_frame, flap_state)
+            if not reachable[:-1].any():
+                break
+
+            # Count the pipes passed, as in Simulation.step
+            for pipe in sim.pipes:
+                if not pipe.scored and pipe.x < bird.x:
+                    score += 1
+                    pipe.scored = True
+
+            # Move on to every state reachable on the next frame
+            alive = reachable[:-1]
+            reachable = np.zeros_like(reachable)
+            reachable[self.successors[0][alive]] = True
+            reachable[self.successors[1][alive]] = True
+            if count % 5 == 0:
+                flap_state = count % self.flap_cycle
+            count += 1
+            sim.scroll()
+        return score
+
+
+# Autopilot shared by policy(), set up on first use
+_autopilot = None
+
+
+def policy(sim):
+    """
+    Autopilot policy with the default settings, importable as
+    'autopilot:policy' (e.g. for tournament.py).
+
+    Arguments:
+        sim (Simulation): the game, in game play
+
+    Returns:
+        bool: True to flap
+    """
+    global _autopilot
+    if _autopilot is None:
+        _autopilot = Autopilot(sim.width, sim.height)
+    return _autopilot(sim)
+
+
+# Script entry point
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check which courses can be survived')
+    parser.add_argument('--seeds', type=int, default=100)
+    parser.add_argument('--pipes', type=int, default=100)
+    parser.add_argument('--levels', type=int, nargs='+', default=[0, 1, 2])
+    args = parser.parse_args()
+
+    autopilot = Autopilot()
+    report = {}
+    for level in args.levels:
+        reached = [autopilot.survivable(seed, args.pipes, level) for seed in range(args.seeds)]
+        report[level] = {
+            'courses': args.seeds,
+            'survivable': sum(r == args.pipes for r in reached),
+            'impassable': [[seed, r] for seed, r in enumerate(reached) if r < args.pipes],
+        }
+        print('Level %i: %i of %i courses survivable' % (
+            level, report[level]['survivable'], args.seeds), file=sys.stderr)
+    print(json.dumps(report, indent=2))
@@ -2,24 +2,28 @@ import pygame
 from pygame.locals import *
 from pygame.sprite import Sprite
 
+from assets import load_image, load_mask
+from collision import mask_rects
+
 
 class Base(Sprite):
   
-    def __init__(self):
+    def __init__(self, screen_width, screen_height):
         """
         Initialize the ground sprite.
-        """
-        # Game surface
-        self.surface = pygame.display.get_surface() 
 
+        Arguments:
+            screen_width (int): width of game screen in pixels
+            screen_height (int): height of game screen in pixels
+        """
         # Sprite and mask
-        self.image = pygame.image.load('assets/base.png').convert_alpha()
-        self.mask = pygame.mask.from_surface(self.image)
+        self.image = load_image('base')
+        self.mask = load_mask('base')
         
         # Position 
         self.x = 0
-        self.y = self.surface.get_height() - self.image.get_height()
-        self.max_shift = self.image.get_width() - self.surface.get_width()
+        self.y = screen_height - self.image.get_height()
+        self.max_shift = self.image.get_width() - screen_width
 
 
     def update(self):
@@ -30,15 +34,30 @@ class Base(Sprite):
         self.x = -((-self.x + 4) % self.max_shift)
 
 
-    def draw(self):
+    def draw(self, surface):
         """
         Draw the sprite to the game display.
+
+        Arguments:
+            surface (pygame.Surface): surface to draw onto
+        """
+        surface.blit(self.image, (self.x, self.y))
+
+
+    def solid_rects(self):
+        """
+        Get the solid parts of the base, for collision checks.
+
+        Returns:
+            list: (x0, y0, x1, y1) tuples in screen coordinates
         """
-        self.surface.blit(self.image, (self.x, self.y))
+        x, y = int(self.x), int(self.y)
+        return [(x0 + x, y0 + y, x1 + x, y1 + y)
+                for x0, y0, x1, y1 in mask_rects(self.mask)]
 
     @property
     def rect(self):
         """
-        This property is needed for pygame.sprite.collide_mask
+        This property is needed for collision checks
         """
         return Rect(self.x, self.y, self.image.get_width(), self.image.get_height())
\ No newline at end of file
@@ -0,0 +1,319 @@
+import numpy as np
+
+from bird import Bird
+from pipe import gap_size, midpoint_range, gap_bounds
+from base import Base
+from assets import load_mask
+from collision import mask_rects, pipe_rects, summed_area
+from course import MAX_PIPES
+
+
+def summed_area_array(mask, size):
+    """
+    Get the summed area table of a mask as an array (see
+    collision.summed_area).
+
+    Arguments:
+        mask (pygame.mask.Mask): the mask
+        size (tuple): (width, height) to pad the table to, so tables of
+            different sized masks can be stacked
+
+    Returns:
+        np.ndarray: (height+1, width+1) table of set pixel counts
+    """
+    width, height = mask.get_size()
+    table = np.zeros((size[1] + 1, size[0] + 1), dtype=np.int32)
+    table[:height+1, :width+1] = summed_area(mask)
+
+    # The padding holds no set pixels, so it just repeats the last row/column
+    table[height+1:, :] = table[height, :]
+    table[:, width+1:] = table[:, width, None]
+    return table
+
+
+def sprite_tables(bird):
+    """
+    Get lookup tables of a bird's pre-rotated sprites, so the sprite of many
+    birds can be looked up at once.
+
+    Arguments:
+        bird (Bird): a bird, to take the sprites from
+
+    Returns:
+        tuple: (masks, index, size, sat). masks lists the distinct sprite
+            masks, and the sprite used for a given flap state and angle is
+            index[flap_state, angle]. size holds the (width, height) of each
+            sprite, and sat the padded summed area table of each mask.
+    """
+    masks = []
+    index = np.zeros((len(bird.sprites), max(bird.angles) + 1), dtype=np.int64)
+    for flap_state, rotations in enumerate(bird.sprites):
+        for angle, (image, mask) in rotations.items():
+            if mask not in masks:
+                masks.append(mask)
+            index[flap_state, angle] = masks.index(mask)
+    size = np.array([m.get_size() for m in masks])
+    sat = np.stack([summed_area_array(m, size.max(0)) for m in masks])
+    return masks, index, size, sat
+
+
+def sat_hits(sat, size, rects, x_off, y_off):
+    """
+    Check many sprites against solid rectangles at once.
+    Each rectangle is moved into its sprite's frame and clipped to it, and the
+    sprite's summed area table tells whether any sprite pixel falls inside.
+
+    Arguments:
+        sat (np.ndarray): (n, H+1, W+1) summed area table of each sprite
+        size (np.ndarray): (n, 2) width and height of each sprite
+        rects (np.ndarray): (n, k, 4) rectangles as (x0, y0, x1, y1) in
+            screen coordinates, or (k, 4) rectangles shared by every sprite
+        x_off (np.ndarray): (n, k) or (n, 1) offset from screen to sprite x
+        y_off (np.ndarray): (n, k) or (n, 1) offset from screen to sprite y
+
+    Returns:
+        np.ndarray: boolean array, True where the sprite hits a rectangle
+    """
+    w = size[:, 0, None]
+    h = size[:, 1, None]
+    rows = np.arange(len(sat))[:, None]
+    x0 = np.clip(rects[..., 0] + x_off, 0, w)
+    y0 = np.clip(rects[..., 1] + y_off, 0, h)
+    x1 = np.clip(rects[..., 2] + x_off, 0, w)
+    y1 = np.clip(rects[..., 3] + y_off, 0, h)
+    area = (sat[rows, y1, x1] - sat[rows, y0, x1]
+            - sat[rows, y1, x0] + sat[rows, y0, x0])
+    return (area > 0).any(axis=1)
+
+
+class BatchSimulation():
+
+    def __init__(self, n, width=288, height=512, level=2, seed=None):
+        """
+        Initialize a batch of n independent games.
+        The state of every game is held in NumPy arrays and all games are
+        advanced together, following the same rules as the Bird, Pipe and
+        Simulation classes.
+
+        Arguments:
+            n (int): number of games
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            seed (int): seed for the random pipe placement
+        """
+        self.n = n
+        self.width, self.height = width, height
+        self.level = level
+        self.rng = np.random.default_rng(seed)
+
+        # Take the bird and base parameters from the sprites themselves, so
+        # the rules stay in sync with the game
+        bird = Bird(0.2*width, 0.45*height)
+        base = Base(width, height)
+        self.bird_x = bird.x
+        self.bird_y_init = bird.y_init
+        self.angle_threshold = bird.angle_threshold
+        self.angle_flap = bird.angle_flap
+        self.rate_of_rotation = bird.rate_of_rotation
+        self.velocity_flap = bird.velocity_flap
+        self.velocity_terminal = bird.velocity_terminal
+        self.velocity_init = bird.velocity_y
+        self.base_max_shift = base.max_shift
+        self.base_y = base.y
+
+        # Bird sprites. The sprite used for a given flap state and angle is
+        # sprite_index[flap_state, angle].
+        (self.sprite_masks, self.sprite_index,
+         self.sprite_size, self.sprite_sat) = sprite_tables(bird)
+
+        # Solid rectangles making up each pipe pair (relative to the pipe's
+        # x-coordinate), indexed by midpoint. Unused slots are left empty.
+        self.gap = gap_size(level)
+        self.midpoints = midpoint_range(height)
+        rects = []
+        for midpoint in self.midpoints:
+            top, gap_top, gap_bottom = gap_bounds(self.gap, midpoint)
+            rects.append(pipe_rects(0, top, top + height, gap_top, gap_bottom))
+        k = max(len(r) for r in rects)
+        self.pipe_rects = np.zeros((len(self.midpoints), k, 4), dtype=np.int64)
+        for i, r in enumerate(rects):
+            self.pipe_rects[i, :len(r)] = r
+        self.pipe_width = load_mask('pipe').get_size()[0]
+        self.base_rects = np.array(mask_rects(base.mask), dtype=np.int64)
+
+        # Bird state
+        self.y = np.zeros(n)
+        self.velocity_y = np.zeros(n, dtype=np.int64)
+        self.angle = np.zeros(n, dtype=np.int64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.flap_state = np.zeros(n, dtype=np.int64)
+
+        # Pipe state. Pipes live in a ring of MAX_PIPES slots per game, with
+        # the oldest pipe at pipe_head.
+        self.pipe_x = np.zeros((n, MAX_PIPES), dtype=np.int64)
+        self.pipe_midpoint = np.zeros((n, MAX_PIPES), dtype=np.int64)
+        self.pipe_alive = np.zeros((n, MAX_PIPES), dtype=bool)
+        self.pipe_counted = np.zeros((n, MAX_PIPES), dtype=bool)
+        self.pipe_head = np.zeros(n, dtype=np.int64)
+        self.pipe_count = np.zeros(n, dtype=np.int64)
+
+        # Base and game state
+        self.base_x = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+
+    def reset(self, which=None):
+        """
+        Reset games back to the start of game play.
+
+        Arguments:
+            which (np.ndarray): optional boolean array selecting the games to
+                reset. All games are reset by default.
+        """
+        if which is None:
+            which = np.ones(self.n, dtype=bool)
+        m = int(which.sum())
+        if m == 0:
+            return
+
+        self.y[which] = self.bird_y_init
+        self.velocity_y[which] = self.velocity_init
+        self.angle[which] = 0
+        self.count[which] = 0
+        self.flap_state[which] = 0
+
+        # Start with two pipes off screen
+        self.pipe_x[which] = [int(self.width*1.5), int(self.width*2), 0]
+        self.pipe_midpoint[which] = self.random_midpoints((m, MAX_PIPES))
+        self.pipe_alive[which] = [True, True, False]
+        self.pipe_counted[which] = False
+        self.pipe_head[which] = 0
+        self.pipe_count[which] = 2
+
+        self.base_x[which] = 0
+        self.score[which] = 0
+        self.done[which] = False
+
+
+    def random_midpoints(self, shape):
+        """
+        Randomly generate pipe gap midpoints.
+
+        Arguments:
+            shape (tuple): shape of the array to generate
+
+        Returns:
+            np.ndarray: midpoint y-coordinates
+        """
+        return self.rng.integers(self.midpoints.start, self.midpoints.stop, shape)
+
+
+    def check_collide(self):
+        """
+        Check every game's bird against its pipes and the base.
+        This is pixel exact: each obstacle is broken down into solid
+        rectangles, and the bird mask's summed area table tells whether any
+        bird pixel falls inside of them.
+
+        Returns:
+            np.ndarray: boolean array, True where the bird has collided
+        """
+        bird_x = int(self.bird_x)
+        bird_y = np.trunc(self.y).astype(np.int64)
+        sprite = self.sprite_index[self.flap_state, self.angle]
+        sat = self.sprite_sat[sprite]
+        size = self.sprite_size[sprite]
+
+        # Pipes. Rectangles of every live pipe are flattened into one axis.
+        mid_index = np.where(self.pipe_alive,
+                             self.pipe_midpoint - self.midpoints.start, 0)
+        rects = self.pipe_rects[mid_index]
+        x_off = (self.pipe_x - bird_x)[..., None]
+        x_off = np.where(self.pipe_alive[..., None], x_off, -(1 << 20))
+        y_off = np.broadcast_to(-bird_y[:, None, None], x_off.shape)
+        collided = sat_hits(sat, size, rects.reshape(self.n, -1, 4),
+                            x_off.repeat(rects.shape[2], 2).reshape(self.n, -1),
+                            y_off.repeat(rects.shape[2], 2).reshape(self.n, -1))
+
+        # Base
+        base_rects = np.broadcast_to(self.base_rects, (self.n,) + self.base_rects.shape)
+        collided |= sat_hits(sat, size, base_rects, (self.base_x - bird_x)[:, None],
+                             (self.base_y - bird_y)[:, None])
+        return collided
+
+
+    def step(self, actions):
+        """
+        Advance every game by one frame. Games that end are reset straight
+        away, so the batch is always ready for the next step.
+
+        Arguments:
+            actions (np.ndarray): boolean array, True where the bird flaps
+
+        Returns:
+            tuple: (rewards, dones, scores) arrays. Rewards are the points
+            scored this frame, and scores are the game scores at the end of
+            this frame (the final score for games that just ended).
+        """
+        flap = np.asarray(actions, dtype=bool)
+
+        # Birds that have collided are done. Their state is left as is.
+        self.done[:] = self.check_collide()
+        alive = ~self.done
+        rewards = np.zeros(self.n, dtype=np.int64)
+
+        # If the player passes through a pipe, add +1 to score
+        passed = (alive[:, None] & self.pipe_alive & ~self.pipe_counted
+                  & (self.pipe_x < self.bird_x))
+        self.pipe_counted |= passed
+        rewards += passed.sum(axis=1)
+        self.score += rewards
+
+        # Update base
+        self.base_x[alive] = -((-self.base_x[alive] + 4) % self.base_max_shift)
+
+        # Update bird angle (see Bird.update_angle)
+        angle = np.maximum(self.angle - self.rate_of_rotation, self.angle_threshold)
+        angle = np.where(flap, self.angle_flap, angle)
+        self.angle = np.where(alive, angle, self.angle)
+
+        # Update bird velocity (see Bird.update_velocity) and position
+        velocity = np.minimum(self.velocity_y + 1, self.velocity_terminal)
+        velocity = np.where(flap, self.velocity_flap, velocity)
+        self.velocity_y = np.where(alive, velocity, self.velocity_y)
+        self.y = np.where(alive, self.y + self.velocity_y, self.y)
+
+        # Every 5 frames, change the wing flap (see Bird.change_flap_state)
+        change = alive & (self.count % 5 == 0)
+        self.flap_state[change] = self.count[change] % self.sprite_index.shape[0]
+        self.count[alive] += 1
+
+        # Update pipes
+        self.pipe_x[alive] -= 4 * self.pipe_alive[alive]
+
+        # Add a new pipe when the oldest pipe has shifted off screen
+        rows = np.arange(self.n)
+        head_x = self.pipe_x[rows, self.pipe_head]
+        spawn = alive & (head_x < 0) & (self.pipe_count < MAX_PIPES)
+        slot = (self.pipe_head + self.pipe_count) % MAX_PIPES
+        self.pipe_x[rows[spawn], slot[spawn]] = self.width + 50
+        self.pipe_midpoint[rows[spawn], slot[spawn]] = self.random_midpoints(int(spawn.sum()))
+        self.pipe_alive[rows[spawn], slot[spawn]] = True
+        self.pipe_counted[rows[spawn], slot[spawn]] = False
+        self.pipe_count[spawn] += 1
+
+        # Remove the oldest pipe once it has shifted left off screen
+        remove = alive & (head_x < -self.pipe_width)
+        self.pipe_alive[rows[remove], self.pipe_head[remove]] = False
+        self.pipe_head[remove] = (self.pipe_head[remove] + 1) % MAX_PIPES
+        self.pipe_count[remove] -= 1
+
+        # Restart any games that have ended
+        scores = self.score.copy()
+        dones = self.done.copy()
+        self.reset(dones)
+        return rewards, dones, scores
@@ -0,0 +1,256 @@
+"""
+Benchmark suite for the game.
+
+Measures the cost of the game logic, pipe spawning, collision checks and
+drawing, using scripted input and fixed seeds so runs are comparable. Results
+are printed as JSON, and can be saved as a baseline and compared against
+later to catch performance regressions.
+
+With --latency, also measures the input latency of a real time game. It
+depends on wall clock timing, so it's reported but never compared.
+
+Usage:
+    python benchmark.py [--save baseline.json] [--compare baseline.json]
+                        [--latency]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+# Run without a window, and keep pygame's banner out of the JSON output
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+from simulation import Simulation
+from pipe import Pipe
+
+
+def scripted_policy(sim):
+    """
+    Scripted input: flap whenever the bird drops too close to the bottom of
+    the next gap.
+
+    Arguments:
+        sim (Simulation): the game simulation
+
+    Returns:
+        bool: whether or not the bird should flap
+    """
+    pipe = sim.next_pipe()
+    if pipe is None:
+        return sim.player.y > sim.height / 2
+    return sim.player.y > pipe.gap_bottom - 44
+
+
+def timed(function, repeats=7):
+    """
+    Time a function a few times. The fastest run is the one least disturbed
+    by whatever else the machine was doing.
+
+    Arguments:
+        function (callable): the function to time
+        repeats (int): number of times to run it
+
+    Returns:
+        float: best run time (in seconds)
+    """
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_simulation(frames=20000, level=0):
+    """
+    Headless game play speed, in frames per second.
+    Games are restarted with the next seed whenever the bird crashes.
+    """
+    def run():
+        seed = 0
+        sim = Simulation(level=level, rng=random.Random(seed))
+        sim.start()
+        for i in range(frames):
+            if not sim.step(scripted_policy(sim)):
+                seed += 1
+                sim = Simulation(level=level, rng=random.Random(seed))
+                sim.start()
+    return {'simulation_frames_per_sec': (frames / timed(run), 'frames/s', 'higher')}
+
+
+def bench_pipe_spawn(count=20000):
+    """
+    Cost of constructing a pipe pair, in microseconds.
+    """
+    rng = random.Random(0)
+    def run():
+        for i in range(count):
+            Pipe(338, i % 3, 512, rng)
+    return {'pipe_spawn_time': (timed(run) / count * 1e6, 'us', 'lower')}
+
+
+def bench_collision(counts=(1, 2, 4, 8, 16, 32), checks=5000):
+    """
+    Cost of a collision check against a growing number of obstacles, in
+    microseconds. Half of the pipes overlap the bird horizontally.
+    """
+    results = {}
+    rng = random.Random(0)
+    sim = Simulation(level=1, rng=rng)
+    sim.start()
+    player = sim.player
+    for count in counts:
+        pipes = [Pipe(player.x - 20 + 100 * (i % 2) * (i + 1), 1, 512, rng)
+                 for i in range(count)]
+        obstacles = pipes + [sim.base]
+
+        def run():
+            for i in range(checks):
+                player.y = 100 + i % 200
+                player.check_collide(obstacles)
+        key = 'collision_time_%i_obstacles' % count
+        results[key] = (timed(run) / checks * 1e6, 'us', 'lower')
+    return results
+
+
+def bench_render(frames=600, level=0):
+    """
+    Cost of drawing a game play frame, in microseconds.
+    """
+    # Imported here, since it opens a window
+    from main import Game
+
+    game = Game(fast_forward=True, render_every=0, seed=0)
+    game.level = level
+    game.sim.start(level)
+    times = []
+    for i in range(frames):
+        if not game.sim.step(scripted_policy(game.sim)):
+            game.sim = Simulation(rng=random.Random(i))
+            game.sim.start(level)
+        game.game_text.score = game.sim.score
+        start = time.perf_counter()
+        game.update_display('main')
+        times.append(time.perf_counter() - start)
+    pygame.display.quit()
+    return {'render_time': (statistics.median(times) * 1e6, 'us', 'lower')}
+
+
+def bench_input_latency(presses=100, level=0, seed=0):
+    """
+    Time from a key press to the frame that acts on it being shown on screen,
+    in milliseconds, in a real time game. Space bar presses are posted from
+    another thread at random times, while a scripted policy flies the bird.
+
+    The latency mostly depends on when in the 33 ms tick a key is pressed,
+    so it isn't compared against baselines.
+    """
+    # Imported here, since it opens a window
+    from main import Game
+
+    game = Game(seed=seed)
+    game.level = level
+    rng = random.Random(seed)
+
+    def press():
+        for i in range(presses):
+            time.sleep(rng.uniform(0.01, 0.05))
+            event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE)
+            pygame.event.post(event)
+
+    # Once the presses are done, the bird stops flapping and the game ends
+    presser = threading.Thread(target=press, daemon=True)
+    presser.start()
+    game.main_loop(lambda sim: presser.is_alive() and scripted_policy(sim))
+    presser.join()
+    stats = game.input.stats().get('to_display')
+    pygame.display.quit()
+
+    # No press is recorded if the bird crashes before any is shown
+    if stats is None:
+        return {}
+    return {'input_latency_p50': (stats['p50'], 'ms', None),
+            'input_latency_p95': (stats['p95'], 'ms', None)}
+
+
+def run_all(latency=False):
+    """
+    Run every benchmark.
+
+    Arguments:
+        latency (bool): also measure the input latency, which takes a few
+            seconds of real time
+
+    Returns:
+        dict: results by name, as {'value', 'unit', 'better'} dicts. Results
+        that are only reported, never compared, have 'better' set to None.
+    """
+    results = {}
+    benches = [bench_simulation, bench_pipe_spawn, bench_collision,
+               bench_render]
+    if latency:
+        benches.append(bench_input_latency)
+    for bench in benches:
+        for name, (value, unit, better) in bench().items():
+            results[name] = {'value': value, 'unit': unit, 'better': better}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline.
+
+    Arguments:
+        results (dict): results from run_all()
+        baseline (dict): saved results from an earlier run
+        tolerance (float): allowed slowdown, as a fraction of the baseline
+
+    Returns:
+        list: names of the benchmarks that got slower than allowed
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or result['better'] is None:
+            continue
+        old, new = baseline[name]['value'], result['value']
+        if result['better'] == 'higher':
+            slower = new < old * (1 - tolerance)
+        else:
+            slower = new > old * (1 + tolerance)
+        if slower:
+            regressions.append(name)
+    return regressions
+
+
+# Script entry point
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flappy Bird benchmarks')
+    parser.add_argument('--save', help='save the results to this file')
+    parser.add_argument('--compare', help='compare against this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown vs the baseline (default 0.2)')
+    parser.add_argument('--latency', action='store_true',
+                        help='also measure the input latency (not compared)')
+    args = parser.parse_args()
+
+    results = run_all(args.latency)
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name in regressions:
+            print('REGRESSION: %s' % name, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
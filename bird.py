@@ -2,6 +2,9 @@ import pygame
 from pygame.locals import *
 from pygame.sprite import Sprite
 
+from assets import load_rotations
+from collision import collide
+
 #Todo: customizable sprites
 
 class Bird(Sprite):
@@ -13,9 +16,6 @@ class Bird(Sprite):
             x_init (int): x-coordinate of starting position 
             y_init (int): y-coordinate of starting position
         """
-        # Game surface
-        self.surface = pygame.display.get_surface() 
-
         # Game frame counter
         self.count = 0
 
@@ -38,25 +38,19 @@ class Bird(Sprite):
         self.velocity_flap = -9
         self.velocity_terminal = 10
 
-        # Sprite images
-        im_upflap = pygame.image.load('assets/bird_upflap.png').convert_alpha()
-        im_midflap = pygame.image.load('assets/bird_midflap.png').convert_alpha()
-        im_downflap = pygame.image.load('assets/bird_downflap.png').convert_alpha()
-
-        # Sprite masks
-        mask_upflap = pygame.mask.from_surface(im_upflap)
-        mask_midflap = pygame.mask.from_surface(im_midflap)
-        mask_downflap = pygame.mask.from_surface(im_downflap)
-
         # Oscillation state parameters
         self.osc_cycle = [0,1,2,3,4,5,6,7,8,7,6,5,4,3,2,1,0,
                           -1,-2,-3,-4,-5,-6,-7,-8,-7,-6,-5,-4,-3,-2,-1]
 
         # Flap state parameters
-        self.im_cycle = [im_upflap, im_midflap, im_downflap, im_midflap]
-        self.mask_cycle = [mask_upflap, mask_midflap, mask_downflap, mask_midflap]
-        self.image = self.im_cycle[self.count]
-        self.mask = self.mask_cycle[self.count]
+        self.im_cycle = ['bird_upflap', 'bird_midflap', 'bird_downflap', 'bird_midflap']
+        self.flap_state = 0
+
+        # Sprite images and masks, pre-rotated for every flap state and every
+        # angle the bird can be tilted to. Looked up as 
+        # self.sprites[flap_state][angle].
+        self.angles = [0] + list(range(self.angle_threshold, self.angle_flap + 1))
+        self.sprites = load_rotations(self.im_cycle, self.angles)
 
 
     def update(self, key_press=False):
@@ -132,9 +126,7 @@ class Bird(Sprite):
         """
         Change the flap state.
         """
-        flap_state = self.count % len(self.im_cycle)
-        self.image = self.im_cycle[flap_state]
-        self.mask = self.mask_cycle[flap_state]
+        self.flap_state = self.count % len(self.im_cycle)
 
 
     def oscillate(self):
@@ -151,25 +143,31 @@ class Bird(Sprite):
         The bird can collide with the pipes or the ground.
 
         Arguments:
-            sprite (pygame.sprite or list): A sprite instance or a list of 
-                sprite instances. All must have the rect property.
+            sprite (pygame.sprite or iterable): A sprite instance or a list 
+                (or any other iterable, such as a course.PipeRing) of sprite
+                instances. All must have the rect property and the
+                solid_rects method.
 
         Returns:
             bool: True if collision with sprite instance, False otherwise
         """
-        if isinstance(sprite, list):
+        if isinstance(sprite, Sprite):
+            return collide(self, sprite)
+        else: 
             for s in sprite:
-                if pygame.sprite.collide_mask(self, s):
+                if collide(self, s):
                     return True
             return False
-        else: 
-            return pygame.sprite.collide_mask(self, sprite)
 
 
-    def draw(self):
-        """Draw the sprite onto the game display."""
-        rotated_image = pygame.transform.rotate(self.image, self.angle)
-        self.surface.blit(rotated_image, (self.x, self.y))
+    def draw(self, surface):
+        """
+        Draw the sprite onto the game display.
+
+        Arguments:
+            surface (pygame.Surface): surface to draw onto
+        """
+        surface.blit(self.image, (self.x, self.y))
 
 
     def set_game_play_mode(self, is_playing):
@@ -182,9 +180,33 @@ class Bird(Sprite):
         self.game_play = is_playing
         
 
+    @property
+    def image(self):
+        """
+        The sprite image for the current flap state, rotated to the current
+        angle.
+        """
+        return self.sprites[self.flap_state][self.angle][0]
+
+    @property
+    def mask(self):
+        """
+        The collision mask for the current flap state, rotated to the current
+        angle.
+        """
+        return self.sprites[self.flap_state][self.angle][1]
+
+    @property
+    def appearance(self):
+        """
+        What the bird currently looks like, for the renderer to tell when it
+        needs redrawing.
+        """
+        return (self.flap_state, self.angle)
+
     @property
     def rect(self):
         """
-        This property is needed for pygame.sprite.collide_mask
+        This property is needed for collision checks
         """
         return Rect(self.x, self.y, self.image.get_width(), self.image.get_height())
\ No newline at end of file
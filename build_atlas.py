@@ -0,0 +1,89 @@
+"""
+Asset build step: pack every sprite image into a single atlas.
+
+The atlas is stored as raw RGBA pixels (assets/atlas.rgba), which the game
+memory-maps at startup instead of decoding each PNG, along with an index of
+where each image sits in it (assets/atlas.json). Re-run this whenever the
+images in assets/ change.
+
+Usage:
+    python build_atlas.py
+"""
+import glob
+import json
+import os
+
+import pygame
+
+from assets import ASSET_DIR, ATLAS_PIXELS, ATLAS_INDEX
+
+
+def pack(sizes, max_width=1024):
+    """
+    Lay out rectangles in rows ("shelves"), tallest first.
+
+    Arguments:
+        sizes (dict): (width, height) of each rectangle, by name
+        max_width (int): widest a row can get (in pixels), unless a single
+            rectangle is wider
+
+    Returns:
+        tuple: ((x, y, width, height) of each rectangle by name, (width,
+            height) of the packed area)
+    """
+    regions = {}
+    x = y = row_height = width = 0
+    for name in sorted(sizes, key=lambda n: (-sizes[n][1], n)):
+        w, h = sizes[name]
+        if x > 0 and x + w > max_width:
+            # Start a new row
+            x, y = 0, y + row_height
+            row_height = 0
+        regions[name] = (x, y, w, h)
+        x += w
+        row_height = max(row_height, h)
+        width = max(width, x)
+    return regions, (width, y + row_height)
+
+
+def build_atlas(asset_dir=ASSET_DIR):
+    """
+    Pack the PNG images in a folder into an atlas, and save it next to them.
+
+    Arguments:
+        asset_dir (str): folder holding the images
+
+    Returns:
+        dict: the atlas index
+    """
+    images = {}
+    for path in sorted(glob.glob(os.path.join(asset_dir, '*.png'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        images[name] = pygame.image.load(path)
+
+    regions, size = pack({name: image.get_size() for name, image in images.items()})
+
+    # Copy the pixels over row by row, rather than blitting, so they are kept
+    # exactly as they are (blitting would blend partly transparent pixels)
+    width, height = size
+    pixels = bytearray(width * height * 4)
+    for name, image in images.items():
+        x, y, w, h = regions[name]
+        data = pygame.image.tobytes(image, 'RGBA')
+        for row in range(h):
+            start = ((y + row) * width + x) * 4
+            pixels[start:start + w*4] = data[row*w*4:(row + 1)*w*4]
+
+    with open(os.path.join(asset_dir, ATLAS_PIXELS), 'wb') as f:
+        f.write(pixels)
+    index = {'size': list(size), 'regions': {n: list(r) for n, r in regions.items()}}
+    with open(os.path.join(asset_dir, ATLAS_INDEX), 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    return index
+
+
+# Script entry point
+if __name__ == '__main__':
+    index = build_atlas()
+    print('Packed %i images into a %ix%i atlas' % (
+        len(index['regions']), index['size'][0], index['size'][1]))
@@ -0,0 +1,187 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+
+
+# Output formats: one raw RGB stream, or numbered PPM or PNG images
+FORMATS = ['raw', 'ppm', 'png']
+
+
+class FrameCapture():
+
+    def __init__(self, path, size, image_format='raw', pool_size=8,
+                 times_path=None):
+        """
+        Initialize a frame capture, which records the frames drawn to disk.
+
+        Each frame is copied into one of a fixed set of buffers, and a
+        background thread writes the buffers out and hands them back. The game
+        never waits on the disk: if every buffer is still waiting to be
+        written, the frame is dropped instead.
+
+        Frames are captured when they're drawn, which isn't at a steady rate
+        (e.g. the game over screen is only redrawn when something changes),
+        so the time of every frame written is saved too, in milliseconds
+        since the first frame. The times file is in the 'timestamp format v2'
+        that e.g. mkvmerge reads.
+
+        Arguments:
+            path (str): file to write. For the 'raw' format, every frame is
+                written to this file one after the other, as 8-bit RGB rows.
+                For the image formats, this is a pattern for the numbered
+                images, such as 'frames/%06i.png'.
+            size (tuple): (width, height) of the frames
+            image_format (str): one of 'raw', 'ppm' or 'png'
+            pool_size (int): number of frame buffers
+            times_path (str): file to save the frame times to. Defaults to
+                the path with '.times' added for the 'raw' format, and to
+                'times.txt' next to the images for the image formats.
+        """
+        if image_format not in FORMATS:
+            raise ValueError('Unknown capture format %r' % image_format)
+        self.path = path
+        self.size = size
+        self.image_format = image_format
+
+        # Buffer pool of 32-bit pixels, straight from the surface. Buffers
+        # are handed back and forth between the game and the writer thread by
+        # their index.
+        width, height = size
+        self.buffers = [np.empty((height, width, 4), dtype=np.uint8)
+                        for i in range(pool_size)]
+        self.free = queue.Queue()
+        for i in range(pool_size):
+            self.free.put(i)
+        self.pending = queue.Queue()
+
+        # Number of frames offered, written and dropped
+        self.frames = 0
+        self.written = 0
+        self.dropped = 0
+
+        # First error hit by the writer thread, if any
+        self.error = None
+
+        directory = os.path.dirname(path % 0 if image_format != 'raw' else path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'wb') if image_format == 'raw' else None
+
+        # Times of the frames written, starting from the first frame captured
+        if times_path is None:
+            if image_format == 'raw':
+                times_path = path + '.times'
+            else:
+                times_path = os.path.join(directory, 'times.txt')
+        self.times_path = times_path
+        self.times_file = open(times_path, 'w')
+        self.times_file.write('# timestamp format v2\n')
+        self.start = None
+
+        self.thread = threading.Thread(target=self.write_frames, daemon=True)
+        self.thread.start()
+
+
+    def capture(self, surface):
+        """
+        Copy a frame to be written out. Never blocks.
+
+        Arguments:
+            surface (pygame.Surface): the frame, of the capture's size
+
+        Returns:
+            bool: True if the frame was kept, False if it was dropped because
+                the writer has fallen behind
+        """
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        self.frames += 1
+        try:
+            i = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        # Copy the surface's memory as it is, row by row, which is about as
+        # cheap as a copy gets. Sorting out the colour channels is left to
+        # the writer thread.
+        if surface.get_bytesize() != 4:
+            surface = surface.convert(32)
+        width, height = self.size
+        rows = np.frombuffer(surface.get_buffer(), dtype=np.uint8)
+        rows = rows.reshape(height, surface.get_pitch())[:, :width*4]
+        np.copyto(self.buffers[i], rows.reshape(height, width, 4))
+        channels = [shift // 8 for shift in surface.get_shifts()[:3]]
+        self.pending.put((i, channels, now - self.start))
+        return True
+
+
+    def write_frames(self):
+        """
+        Write out frames as they come in. Runs in the writer thread.
+        """
+        width, height = self.size
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            i, channels, timestamp = item
+            if self.error is None:
+                try:
+                    # Pick out the red, green and blue bytes of each pixel
+                    frame = np.ascontiguousarray(self.buffers[i][:, :, channels])
+                    self.write(frame, width, height)
+                    self.times_file.write('%.3f\n' % (timestamp * 1000))
+                    self.written += 1
+                except Exception as e:
+                    # Keep going, so the game never waits on the buffers.
+                    # Every frame from now on is dropped.
+                    self.error = e
+            if self.error is None:
+                self.free.put(i)
+
+
+    def write(self, frame, width, height):
+        """
+        Write out one frame.
+
+        Arguments:
+            frame (np.ndarray): (height, width, 3) RGB pixels
+            width (int): width of the frame
+            height (int): height of the frame
+        """
+        if self.image_format == 'raw':
+            self.file.write(frame)
+        elif self.image_format == 'ppm':
+            with open(self.path % self.written, 'wb') as f:
+                f.write(b'P6\n%i %i\n255\n' % (width, height))
+                f.write(frame)
+        else:
+            image = pygame.image.frombuffer(frame, (width, height), 'RGB')
+            pygame.image.save(image, self.path % self.written)
+
+
+    def close(self):
+        """
+        Finish writing the frames that are left, and stop the writer thread.
+
+        Returns:
+            dict: number of frames offered, written and dropped
+        """
+        if self.thread is not None:
+            self.pending.put(None)
+            self.thread.join()
+            self.thread = None
+            if self.file is not None:
+                self.file.close()
+            self.times_file.close()
+        if self.error is not None:
+            print('Frame capture failed: %s' % self.error, file=sys.stderr)
+        return {'frames': self.frames, 'written': self.written,
+                'dropped': self.dropped}
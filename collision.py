@@ -0,0 +1,151 @@
+from assets import load_mask
+
+
+# Caches of the masks that have been processed so far. Masks are shared
+# through the asset registry, so these stay small.
+_rects = {}
+_tables = {}
+
+
+def mask_rects(mask):
+    """
+    Split a mask into solid rectangles.
+    Consecutive rows with the same runs of set pixels are merged together, so
+    the pipe and base masks break down into just a handful of rectangles.
+
+    Arguments:
+        mask (pygame.mask.Mask): the mask to split up
+
+    Returns:
+        list: (x0, y0, x1, y1) tuples, with x1 and y1 exclusive
+    """
+    if mask in _rects:
+        return _rects[mask]
+    width, height = mask.get_size()
+    rects = []
+    open_rects = {}
+    for y in range(height + 1):
+        # Find the runs of set pixels along this row
+        runs = []
+        x = 0
+        while y < height and x < width:
+            if mask.get_at((x, y)):
+                x_start = x
+                while x < width and mask.get_at((x, y)):
+                    x += 1
+                runs.append((x_start, x))
+            x += 1
+
+        # Close any rectangles that don't continue on this row
+        for run in list(open_rects):
+            if run not in runs:
+                rects.append((run[0], open_rects.pop(run), run[1], y))
+        for run in runs:
+            if run not in open_rects:
+                open_rects[run] = y
+    _rects[mask] = rects
+    return rects
+
+
+def summed_area(mask):
+    """
+    Build the summed area table of a mask, so the number of set pixels within
+    any rectangle can be looked up in constant time.
+
+    Arguments:
+        mask (pygame.mask.Mask): the mask
+
+    Returns:
+        list: (height+1) rows of (width+1) set pixel counts
+    """
+    if mask in _tables:
+        return _tables[mask]
+    width, height = mask.get_size()
+    table = [[0] * (width + 1)]
+    for y in range(height):
+        row = [0]
+        for x in range(width):
+            row.append(row[x] + table[y][x+1] - table[y][x] + mask.get_at((x, y)))
+        table.append(row)
+    _tables[mask] = table
+    return table
+
+
+def pipe_rects(x, top, bottom, gap_top, gap_bottom):
+    """
+    Split a pipe pair into solid rectangles.
+    The pipe pair is built from the shared pipe art: the upper pipe ends at
+    gap_top and the lower pipe starts at gap_bottom. Both are cut off at the
+    top and bottom of the pipe pair.
+
+    Arguments:
+        x (int): x-coordinate of the pipe pair
+        top (int): y-coordinate of the top of the pipe pair
+        bottom (int): y-coordinate of the bottom of the pipe pair
+        gap_top (int): y-coordinate of the top of the gap
+        gap_bottom (int): y-coordinate of the bottom of the gap
+
+    Returns:
+        list: (x0, y0, x1, y1) tuples, with x1 and y1 exclusive
+    """
+    mask_upper = load_mask('pipe', 180)
+    mask_lower = load_mask('pipe')
+    pipe_height = mask_upper.get_size()[1]
+
+    rects = []
+    for mask, y in [(mask_upper, gap_top - pipe_height), (mask_lower, gap_bottom)]:
+        for x0, y0, x1, y1 in mask_rects(mask):
+            y0 = max(y0 + y, top)
+            y1 = min(y1 + y, bottom)
+            if y0 < y1:
+                rects.append((x0 + x, y0, x1 + x, y1))
+    return rects
+
+
+def mask_hits_rects(mask, position, rects):
+    """
+    Check whether any set pixel of a mask falls inside of a list of
+    rectangles.
+
+    Arguments:
+        mask (pygame.mask.Mask): the mask
+        position (tuple): (x, y) screen position of the mask's top left corner
+        rects (list): (x0, y0, x1, y1) tuples in screen coordinates
+
+    Returns:
+        bool: True if any pixel is inside of a rectangle, False otherwise
+    """
+    table = summed_area(mask)
+    width, height = mask.get_size()
+    x, y = position
+    for x0, y0, x1, y1 in rects:
+        # Move the rectangle into the mask's frame and clip it to the mask
+        x0 = min(max(x0 - x, 0), width)
+        x1 = min(max(x1 - x, 0), width)
+        y0 = min(max(y0 - y, 0), height)
+        y1 = min(max(y1 - y, 0), height)
+        if x0 < x1 and y0 < y1:
+            if table[y1][x1] - table[y0][x1] - table[y1][x0] + table[y0][x0]:
+                return True
+    return False
+
+
+def collide(sprite, obstacle):
+    """
+    Check if a sprite has collided with an obstacle.
+    Obstacles that don't overlap the sprite's rect are skipped straight away.
+    Otherwise the sprite's mask is checked against the obstacle's solid
+    rectangles, which gives the same result as pygame.sprite.collide_mask.
+
+    Arguments:
+        sprite (pygame.sprite): sprite with the rect and mask properties
+        obstacle (pygame.sprite): sprite with the rect property and a
+            solid_rects() method
+
+    Returns:
+        bool: True if they have collided, False otherwise
+    """
+    rect = sprite.rect
+    if not rect.colliderect(obstacle.rect):
+        return False
+    return mask_hits_rects(sprite.mask, rect.topleft, obstacle.solid_rects())
@@ -0,0 +1,169 @@
+import sys
+import time
+
+import numpy as np
+import pygame
+from pygame.locals import *
+
+
+# Actions the game's keys stand for, as bits of a bitmask, along with the
+# window being uncovered (so it has to be redrawn)
+FLAP, LEFT, RIGHT, PROFILER, EXPOSED = 1, 2, 4, 8, 16
+
+# Action of each of the game's keys
+KEY_ACTIONS = {
+    K_SPACE: FLAP,
+    K_LEFT: LEFT,
+    K_RIGHT: RIGHT,
+    K_p: PROFILER,
+}
+
+
+class InputQueue():
+
+    def __init__(self, size=300):
+        """
+        Initialize the input queue, which collects the player's key presses
+        between game frames and measures how long they take to show up.
+
+        Pygame doesn't say when an event happened, so events are timestamped
+        when they're received. Rather than sleeping between frames, the game
+        waits on the event queue with wait(), so key presses are received
+        (and timestamped) as soon as they come in. The keys pressed since the
+        last frame are kept as a bitmask of actions, which the next frame
+        takes with take().
+
+        For every key press, the time until the frame that took it, and the
+        time until that frame was shown on screen, are kept for the last few
+        hundred presses in a fixed size ring buffer.
+
+        Arguments:
+            size (int): number of key presses to keep latencies for
+        """
+        self.size = size
+
+        # Actions pressed since the last frame, and the time of each press
+        self.actions = 0
+        self.pressed = []
+
+        # Times of the presses taken by frames that haven't been shown yet,
+        # as (pressed, taken) pairs
+        self.taken = []
+
+        # Ring buffer of latencies in seconds: one row per key press, with
+        # the time until the press was taken and until it was shown
+        self.latencies = np.zeros((size, 2))
+
+        # Total number of key presses recorded
+        self.count = 0
+
+
+    def receive(self, events, now=None):
+        """
+        Add the game's key presses among some events to the queue, and note
+        if the window was uncovered. Will automatically exit game if it gets
+        a quit signal.
+
+        Arguments:
+            events (list): pygame events
+            now (float): time the events were received (from
+                time.perf_counter). Defaults to now.
+        """
+        if now is None:
+            now = time.perf_counter()
+        for event in events:
+
+            # If one of the game's keys is pressed
+            if event.type == KEYDOWN:
+                action = KEY_ACTIONS.get(event.key)
+                if action is not None:
+                    self.actions |= action
+                    self.pressed.append(now)
+
+            # If the window was uncovered
+            elif event.type == WINDOWEXPOSED:
+                self.actions |= EXPOSED
+
+            # If quit triggered
+            elif event.type == QUIT:
+                pygame.quit()
+                sys.exit()
+
+
+    def poll(self):
+        """
+        Receive all queued events.
+        """
+        self.receive(pygame.event.get())
+
+
+    def wait(self, until):
+        """
+        Wait until a given time, receiving events as they come in.
+
+        Arguments:
+            until (float): time to wait until (from time.perf_counter)
+        """
+        while True:
+            remaining = until - time.perf_counter()
+            if remaining <= 0:
+                return
+            if remaining < 0.002:
+                # Too short for the event queue's millisecond timeout
+                time.sleep(remaining)
+                return
+            event = pygame.event.wait(int(remaining * 1000))
+            if event.type != NOEVENT:
+                self.receive([event] + pygame.event.get())
+
+
+    def take(self):
+        """
+        Take the actions pressed since the last frame, for the next frame to
+        act on. Receives any events still queued first.
+
+        Returns:
+            int: bitmask of actions (FLAP, LEFT, RIGHT, PROFILER, EXPOSED)
+        """
+        self.poll()
+        actions = self.actions
+        if self.pressed:
+            now = time.perf_counter()
+            self.taken.extend((pressed, now) for pressed in self.pressed)
+            self.pressed = []
+        self.actions = 0
+        return actions
+
+
+    def displayed(self):
+        """
+        Record that a frame was just shown on screen, finishing off the
+        latencies of the key presses taken before it.
+        """
+        if not self.taken:
+            return
+        now = time.perf_counter()
+        for pressed, taken in self.taken:
+            self.latencies[self.count % self.size] = (taken - pressed, now - pressed)
+            self.count += 1
+        self.taken = []
+
+
+    def stats(self):
+        """
+        Summarize the recorded latencies.
+
+        Returns:
+            dict: key press count, and percentiles of the time from a key
+            press to the frame that took it (to_frame) and to that frame
+            being shown on screen (to_display), all in milliseconds
+        """
+        latencies = self.latencies[:min(self.count, self.size)] * 1000
+        stats = {'presses': len(latencies)}
+        if len(latencies) == 0:
+            return stats
+        for i, name in enumerate(['to_frame', 'to_display']):
+            p50, p95, p99 = np.percentile(latencies[:, i], [50, 95, 99]).tolist()
+            stats[name] = {'p50': p50, 'p95': p95, 'p99': p99,
+                           'max': float(latencies[:, i].max())}
+        return stats
@@ -0,0 +1,156 @@
+import random
+
+from pipe import Pipe, gap_size, midpoint_range
+
+
+# Most pipes that can be on screen in a single game at once
+MAX_PIPES = 3
+
+
+def progressive(start=125, end=75, pipes=50):
+    """
+    Get a difficulty curve where the gaps shrink steadily from one size to
+    another, and then stay at the final size.
+
+    Arguments:
+        start (int): size of the first gap (in pixels)
+        end (int): size of the gaps once the curve is done (in pixels)
+        pipes (int): number of pipes it takes to get from start to end
+
+    Returns:
+        callable: the curve, giving the gap size of each pipe from its number
+    """
+    def curve(index):
+        if index >= pipes:
+            return end
+        return int(start + (end - start) * index / pipes)
+    return curve
+
+
+class Course():
+
+    def __init__(self, difficulty, screen_height, rng=random):
+        """
+        Initialize a pipe course.
+
+        The course is an endless stream of pipe gaps. Each gap is only
+        generated when the next pipe is needed, from the random number
+        generator and the difficulty curve, so the same seed always gives the
+        same course.
+
+        Arguments:
+            difficulty (int or callable): either a level as [0,1,2] = [easy,
+                medium, or hard], for gaps of a fixed size, or a difficulty
+                curve giving the gap size (in pixels) of each pipe from its
+                number (see progressive())
+            screen_height (int): height of the game screen (in pixels)
+            rng (random.Random): random number generator for the pipe
+                placement. Uses the global one by default.
+        """
+        if callable(difficulty):
+            self.curve = difficulty
+        else:
+            gap = gap_size(difficulty)
+            self.curve = lambda index: gap
+        self.midpoints = midpoint_range(screen_height)
+        self.rng = rng
+
+        # Number of gaps generated so far
+        self.index = 0
+
+
+    def __iter__(self):
+        return self
+
+
+    def __next__(self):
+        """
+        Generate the next gap.
+
+        Returns:
+            tuple: (gap size, midpoint y-coordinate) of the gap
+        """
+        gap = self.curve(self.index)
+        midpoint = self.rng.randrange(self.midpoints.start, self.midpoints.stop)
+        self.index += 1
+        return gap, midpoint
+
+
+class PipeRing():
+
+    def __init__(self, screen_height, size=MAX_PIPES):
+        """
+        Initialize a ring of pipe pairs.
+
+        The ring holds a fixed set of pipe pairs that are reused over and over:
+        when a pipe pair leaves the screen, it's moved back to the right with
+        the next gap of the course. Game play never creates new pipes, no
+        matter how long it goes on.
+
+        The pipes on screen can be looped over and indexed like a list, oldest
+        (leftmost) first.
+
+        Arguments:
+            screen_height (int): height of the game screen (in pixels)
+            size (int): most pipe pairs that can be in use at once
+        """
+        midpoint = midpoint_range(screen_height).start
+        self.slots = [Pipe(0, 0, screen_height, midpoint=midpoint)
+                      for i in range(size)]
+
+        # Slot of the oldest pipe, and number of pipes in use
+        self.head = 0
+        self.count = 0
+
+
+    def spawn(self, x, gap, midpoint):
+        """
+        Put a pipe pair at the back of the ring.
+
+        Arguments:
+            x (int): x-coordinate of the pipe pair
+            gap (int): size of the gap (in pixels)
+            midpoint (int): y-coordinate of the middle of the gap
+
+        Returns:
+            Pipe: the pipe pair
+        """
+        if self.count == len(self.slots):
+            raise IndexError('Pipe ring is full')
+        pipe = self.slots[(self.head + self.count) % len(self.slots)]
+        pipe.place(x, gap, midpoint)
+        self.count += 1
+        return pipe
+
+
+    def popleft(self):
+        """
+        Stop using the oldest pipe pair, so it can be reused.
+        """
+        if self.count == 0:
+            raise IndexError('Pipe ring is empty')
+        self.head = (self.head + 1) % len(self.slots)
+        self.count -= 1
+
+
+    def clear(self):
+        """
+        Stop using every pipe pair.
+        """
+        self.head = 0
+        self.count = 0
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __getitem__(self, i):
+        if not -self.count <= i < self.count:
+            raise IndexError('Pipe ring index out of range')
+        return self.slots[(self.head + i % self.count) % len(self.slots)]
+
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.slots[(self.head + i) % len(self.slots)]
@@ -0,0 +1,142 @@
+import random
+
+import numpy as np
+import pygame
+
+from simulation import Simulation
+from assets import load_image
+from game_text import GameText
+from renderer import Renderer
+
+
+class FlappyBirdEnv():
+
+    # Number of values in an observation
+    observation_size = 5
+
+    # Actions: 0 = do nothing, 1 = flap
+    action_size = 2
+
+    def __init__(self, level=2, frame_skip=1, width=288, height=512, pixels=None):
+        """
+        Initialize a new game environment for bots.
+
+        The environment runs the game simulation directly, with no display
+        and no event loop. Each step the bot picks an action, and gets back an
+        observation of the game, a reward, and whether the game is over.
+
+        Observations are: the bird's y-coordinate and velocity, the
+        horizontal distance to the next pipe pair, and the vertical distances
+        from the bird to the top and bottom of the next gap.
+
+        Arguments:
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            frame_skip (int): number of game frames each step lasts. The bird
+                only flaps on the first frame of a step.
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+            pixels (PixelObserver): optionally observe the game as stacked
+                frames of pixels from this observer (see observation.py),
+                rather than as the values above
+        """
+        self.level = level
+        self.pixels = pixels
+        self.frame_skip = frame_skip
+        self.width, self.height = width, height
+
+        # The game itself, set up on reset()
+        self.sim = None
+        self.frames = 0
+
+        # Display, only set up if render() is called
+        self.renderer = None
+        self.game_text = None
+
+
+    def reset(self, seed=None):
+        """
+        Start a new game.
+
+        Arguments:
+            seed (int): seed for the pipe placement, for reproducible games
+
+        Returns:
+            np.ndarray: the first observation
+        """
+        self.sim = Simulation(self.width, self.height, self.level,
+                              random.Random(seed))
+        self.sim.start()
+        self.frames = 0
+        if self.pixels is not None:
+            return self.pixels.reset(self.sim)
+        return self.observe()
+
+
+    def step(self, action):
+        """
+        Advance the game by one step (frame_skip frames).
+
+        Arguments:
+            action (int): 1 to flap, 0 to do nothing
+
+        Returns:
+            tuple: (observation, reward, done, info). The reward is +1 for
+            each pipe pair passed, and -1 for crashing. Once the game is done,
+            stepping does nothing: the last observation comes back again,
+            with no reward.
+        """
+        if self.sim.done:
+            info = {'score': self.sim.score, 'frames': self.frames}
+            if self.pixels is not None:
+                return self.pixels.latest(), 0.0, True, info
+            return self.observe(), 0.0, True, info
+
+        reward = 0.0
+        for i in range(self.frame_skip):
+            score = self.sim.score
+            alive = self.sim.step(bool(action) and i == 0)
+            reward += self.sim.score - score
+            if not alive:
+                reward -= 1.0
+                break
+            self.frames += 1
+
+        info = {'score': self.sim.score, 'frames': self.frames}
+        if self.pixels is not None:
+            return self.pixels.observe(self.sim), reward, self.sim.done, info
+        return self.observe(), reward, self.sim.done, info
+
+
+    def observe(self):
+        """
+        Get the current observation.
+
+        Returns:
+            np.ndarray: float32 array of the observation values
+        """
+        player = self.sim.player
+        pipe = self.sim.next_pipe()
+        if pipe is None:
+            pipe_dx, gap_top, gap_bottom = self.width, 0, self.height
+        else:
+            pipe_dx, gap_top, gap_bottom = pipe.x - player.x, pipe.gap_top, pipe.gap_bottom
+        return np.array([player.y, player.velocity_y, pipe_dx,
+                         gap_top - player.y, gap_bottom - player.y],
+                        dtype=np.float32)
+
+
+    def render(self):
+        """
+        Draw the current frame to a window. The window is opened the first
+        time this is called.
+        """
+        if self.renderer is None:
+            pygame.display.init()
+            screen = pygame.display.set_mode((self.width, self.height))
+            pygame.display.set_caption('Flappy Bird')
+            self.game_text = GameText()
+            self.renderer = Renderer(screen, load_image('background'))
+
+        pygame.event.pump()
+        self.game_text.score = self.sim.score
+        self.renderer.draw(self.sim, self.game_text, 'main')
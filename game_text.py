@@ -1,22 +1,63 @@
 import pygame
+from pygame.locals import *
+
+from assets import load_image
+from controls import LEFT, RIGHT
+
+
+# Fonts of the text panels, by size. The font module is only started once a
+# panel is drawn.
+PANEL_FONTS = {}
+
+
+def text_panel(lines, font_size=16):
+    """
+    Draw lines of white text on a translucent dark panel, e.g. for the
+    profiler overlay or the leaderboard.
+
+    Arguments:
+        lines (list): lines of text, top to bottom
+        font_size (int): height of the font in pixels
+
+    Returns:
+        pygame.Surface: the panel
+    """
+    if font_size not in PANEL_FONTS:
+        pygame.font.init()
+        PANEL_FONTS[font_size] = pygame.font.Font(None, font_size)
+    font = PANEL_FONTS[font_size]
+    texts = [font.render(line, True, (255, 255, 255)) for line in lines]
+    width = max(text.get_width() for text in texts) + 8
+    height = sum(text.get_height() for text in texts) + 8
+    image = pygame.Surface((width, height), pygame.SRCALPHA)
+    image.fill((0, 0, 0, 160))
+    y = 4
+    for text in texts:
+        image.blit(text, (4, y))
+        y += text.get_height()
+    return image
 
 
 class GameText():
 
-    def __init__(self):
+    def __init__(self, surface=None):
         """
         Initialize a new text instance. 
         This handles any global game text, game scores, as well as menu text.
+
+        Arguments:
+            surface (pygame.Surface): surface the game is drawn onto. Defaults
+                to the display.
         """
         # Game surface
-        self.surface = pygame.display.get_surface() 
+        self.surface = surface if surface is not None else pygame.display.get_surface()
 
         # Sprites
-        self.msg_start = pygame.image.load('assets/start_msg.png').convert_alpha()
-        self.msg_end = pygame.image.load('assets/end_msg.png').convert_alpha()
+        self.msg_start = load_image('start_msg')
+        self.msg_end = load_image('end_msg')
         self.digits = []
         for i in range(10):
-            self.digits.append(pygame.image.load('assets/%i.png' % i).convert_alpha())
+            self.digits.append(load_image('%i' % i))
 
         # Location of game_over message
         self.x_msg_end = (self.surface.get_width() - self.msg_end.get_width()) / 2
@@ -42,6 +83,10 @@ class GameText():
         # Score value
         self.score = 0
 
+        # Rendered score image, which is kept until the score changes
+        self.score_image = None
+        self.score_image_value = None
+
 
     def draw(self, mode):
         """
@@ -79,36 +124,67 @@ class GameText():
         """
         Draw the score to the game display.
         """
-        # Extract a list of the individual digits in the score
-        score_digits = [int(i) for i in list(str(self.score))]
+        self.surface.blit(self.render_score(), self.score_rect())
+
 
-        # Find the total width (in pixels) of the score
-        score_width = sum([self.digits[i].get_width() for i in score_digits])
+    def render_score(self):
+        """
+        Render the score digits into a single image. The image is only
+        rebuilt when the score changes.
 
-        # Blit the score digits onto the screen
-        x = (self.surface.get_width() - score_width) / 2
-        for i in score_digits:
-            self.surface.blit(self.digits[i], (x, self.y_score))
-            x += self.digits[i].get_width()
+        Returns:
+            pygame.Surface: the score image
+        """
+        if self.score_image_value != self.score:
+            # Extract a list of the individual digits in the score
+            score_digits = [int(i) for i in list(str(self.score))]
+
+            # Find the total width (in pixels) of the score
+            score_width = sum([self.digits[i].get_width() for i in score_digits])
+            score_height = self.digits[0].get_height()
+
+            # Blit the score digits onto the image
+            self.score_image = pygame.Surface((score_width, score_height), 
+                                              SRCALPHA)
+            if pygame.display.get_surface() is not None:
+                self.score_image = self.score_image.convert_alpha()
+            x = 0
+            for i in score_digits:
+                self.score_image.blit(self.digits[i], (x, 0))
+                x += self.digits[i].get_width()
+            self.score_image_value = self.score
+        return self.score_image
+
+
+    def score_rect(self):
+        """
+        Get the area of the screen covered by the score.
+
+        Returns:
+            pygame.Rect: the score's position and size
+        """
+        image = self.render_score()
+        x = (self.surface.get_width() - image.get_width()) / 2
+        return Rect(x, self.y_score, image.get_width(), image.get_height())
 
 
-    def update_level(self, keys_pressed):
+    def update_level(self, actions):
         """
         Update the selected level.
 
         Arguments:
-            keys_pressed
+            actions (int): bitmask of actions pressed (see controls.py)
 
         Returns:
             int: the selected level, where [0,1,2] corresponds to 
             ['easy', 'medium', 'hard'], respectively.
         """
-        if 'right_arrow' in keys_pressed:
+        if actions & RIGHT:
             if self.level == 2:
                 return self.level
             self.level += 1
 
-        if 'left_arrow' in keys_pressed:
+        if actions & LEFT:
             if self.level == 0:
                 return self.level
             self.level -= 1
@@ -1,14 +1,28 @@
+import atexit
 import random
+import sys
+import time
 
+import numpy as np
 import pygame
 from pygame.locals import *
 from pygame.sprite import Sprite
 
 # Import sprites
-from bird import Bird
-from pipe import Pipe
-from base import Base
 from game_text import GameText
+from assets import load_image
+from renderer import Renderer
+from profiler import FrameProfiler, LISTEN, UPDATE, DISPLAY
+from presenter import ScaledPresenter
+from capture import FrameCapture
+from controls import InputQueue, FLAP, PROFILER, EXPOSED
+from sessions import SessionStore
+
+# Import the game logic
+from simulation import Simulation
+from population import Population
+from scheduler import FixedTimestep
+from replay import Recording
 
 # Import utility functions
 from utils import *
@@ -16,44 +30,140 @@ from utils import *
 
 class Game():
 
-    def __init__(self, width=288, height=512):
+    def __init__(self, width=288, height=512, fast_forward=False, 
+                 render_every=1, render_rate=None, seed=None, record_path=None,
+                 profile=False, profile_path=None, window_size=None,
+                 fullscreen=False, scale_filter='nearest', capture_path=None,
+                 capture_format='raw', session_path=None):
         """
         Initialize the game.
 
         Argument:
             width (int): width of game screen in pixels
             height (int): height of game screen in pixels
+            fast_forward (bool): run the game as fast as possible rather than
+                in real time (e.g. for bots and replays)
+            render_every (int): when fast forwarding, draw every this many
+                frames. 0 means never draw.
+            render_rate (int): frames drawn per second in real time. Rates
+                above the game's frame rate draw interpolated frames.
+            seed (int): seed for the pipe placement. Random by default.
+            record_path (str): optionally save a recording of the game (see
+                replay.py) to this file when the game ends
+            profile (bool): time each phase of every frame. Press p during
+                the game to show the timings on screen.
+            profile_path (str): optionally save the frame timings to this CSV
+                file when the game exits
+            window_size (tuple): optionally draw the game at its own size and
+                scale it up to a window of this (width, height)
+            fullscreen (bool): scale the game up to fill the monitor
+            scale_filter (str): filter used to scale the game up, either
+                'nearest' (pixelated) or 'smooth'
+            capture_path (str): optionally record every frame drawn to this
+                file (see capture.py). For image sequences, this is a pattern
+                such as 'frames/%06i.png'.
+            capture_format (str): format of the recorded frames, one of 'raw',
+                'ppm' or 'png'
+            session_path (str): optionally save every game to this SQLite
+                database (see sessions.py), and show the best scores on the
+                game over screen
         """
-        pygame.init()
+        # Only start the parts of pygame the game uses. pygame.init() would
+        # also start up audio and joysticks, which slows down startup.
+        pygame.display.init()
+
+        # Only queue the events the game listens for
+        allow_events()
 
         # Frame rate of the game
         self.fps = 30
 
-        # Game clock which ticks according to the game framerate
-        self.clock = pygame.time.Clock()
+        # Key presses from the player. They're received as they come in, in
+        # between frames, and the next frame acts on them.
+        self.input = InputQueue()
+
+        # Game scheduler, which advances the game at a fixed rate no matter
+        # how often frames are drawn
+        self.scheduler = FixedTimestep(self.fps, fast_forward, render_every, 
+                                       render_rate, wait=self.input.wait)
 
         # Set up display
         self.width, self.height = width, height
-        self.screen = pygame.display.set_mode((self.width, self.height))
+        if window_size is not None or fullscreen:
+            # The game is drawn offscreen at its own size, then scaled up
+            self.presenter = ScaledPresenter((width, height), window_size,
+                                             fullscreen, scale_filter)
+            self.screen = self.presenter.surface
+            present = self.presenter.present
+        else:
+            self.presenter = None
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            present = None
         pygame.display.set_caption('Flappy Bird')
 
-        # Set up game objects
-        self.bg = pygame.image.load('assets/background.png').convert_alpha()
-        self.game_text = GameText()
-        self.player = Bird(0.2*width, 0.45*height)
-        self.base = Base()
-        self.pipes = []
-
-        # List of flags indicating whether or not the pass through of the pipe 
-        # pairs has been counted yet
-        self.pipe_counted = [False, False]
+        # Set up game objects. All of the game logic lives in the simulation,
+        # the game itself only handles user input and drawing.
+        self.bg = load_image('background')
+        self.game_text = GameText(self.screen)
+        self.renderer = Renderer(self.screen, self.bg, present)
 
         # Set game difficulty as [0,1,2] = [easy, medium, or hard]
         self.level = 2
 
+        # Positions of the bird, base and pipes before the latest frame, for
+        # drawing interpolated frames
+        self.last_positions = None
+
+        # Recording of the player's input during game play
+        self.record_path = record_path
+        self.recording = None
+
+        # Frame profiler. The simulation only gets it when it's enabled, so
+        # headless game play pays nothing for it otherwise.
+        self.profiler = FrameProfiler(profile, export_path=profile_path if profile else None)
+        self.profiler.input = self.input
+
+        # Frame capture. Frames are written out by a background thread, which
+        # is finished off when the game exits.
+        self.capture = None
+        if capture_path is not None:
+            self.capture = FrameCapture(capture_path, (width, height), capture_format)
+            atexit.register(self.stop_capture)
+
+        # Store of finished games. Games are saved and the leaderboard is
+        # read on a background thread.
+        self.sessions = None
+
+        # Time between the frames of the game in progress, in seconds, for
+        # the summary saved with it. Grown if a game outlasts it.
+        self.frame_times = np.zeros(self.fps * 600)
+        if session_path is not None:
+            self.sessions = SessionStore(session_path)
+            atexit.register(self.sessions.close)
 
+        # Set up the first game
+        self.new_game(seed if seed is not None else random.randrange(2**32))
 
-    def update_display(self, mode):
+
+    def new_game(self, seed=None):
+        """
+        Set up a new game, starting from the welcome screen. The selected
+        level is kept.
+
+        Arguments:
+            seed (int): seed for the pipe placement. By default, the seed
+                after the last game's, so a seeded session stays reproducible.
+        """
+        self.seed = seed if seed is not None else (self.seed + 1) % 2**64
+        self.sim = Simulation(self.width, self.height, rng=random.Random(self.seed))
+        if self.profiler.enabled:
+            self.sim.profiler = self.profiler
+        self.game_text.score = 0
+        self.last_positions = None
+        self.recording = None
+
+
+    def update_display(self, mode, alpha=1.0):
         """
         Update the game display with the game background and sprites. 
 
@@ -62,51 +172,136 @@ class Game():
 
         Arguments:
             mode (str): Can be one of [welcome, main, game_over]
+            alpha (float): how far along the frame is from the previous game
+                frame (0) to the latest one (1). Sprites are drawn in between.
+        """
+        self.profiler.resume()
+        overlays = [self.profiler.overlay()]
+        if mode == 'game_over' and self.sessions is not None:
+            overlays.append(self.sessions.overlay(self.level))
+        self.renderer.overlays = [overlay for overlay in overlays if overlay is not None]
+        if alpha >= 1.0 or self.last_positions is None:
+            # Only the parts of the display that changed since the last frame
+            # are redrawn and updated
+            self.renderer.draw(self.sim, self.game_text, mode)
+            self.input.displayed()
+            self.capture_frame()
+            self.profiler.mark(DISPLAY)
+            return
+
+        # Move the sprites part of the way from where they were to where they
+        # are now, draw them, and then put them back
+        positions = self.save_positions()
+        bird_y, base_x, pipe_x = self.last_positions
+        player, base = self.sim.player, self.sim.base
+        player.y = bird_y + (player.y - bird_y) * alpha
+        base_shift = base.x - base_x
+        if base_shift > 0:
+            # The base has looped back around
+            base_shift -= base.max_shift
+        base.x = int(base_x + base_shift * alpha)
+        for pipe in self.sim.pipes:
+            if id(pipe) in pipe_x:
+                pipe.x = int(pipe_x[id(pipe)] + (pipe.x - pipe_x[id(pipe)]) * alpha)
+        self.renderer.draw(self.sim, self.game_text, mode)
+        self.input.displayed()
+        self.restore_positions(positions)
+        self.capture_frame()
+        self.profiler.mark(DISPLAY)
+
+
+    def capture_frame(self):
         """
-        # Draw the background
-        self.screen.blit(self.bg, (0,0))
+        Hand the frame just drawn to the frame capture, if recording.
+        """
+        if self.capture is not None:
+            self.capture.capture(self.screen)
+
+
+    def stop_capture(self):
+        """
+        Finish writing the captured frames, and report how many were dropped.
+        """
+        if self.capture is not None:
+            stats = self.capture.close()
+            print('Captured %i of %i frames to %s (%i dropped)' % (
+                stats['written'], stats['frames'], self.capture.path,
+                stats['dropped']), file=sys.stderr)
+            self.capture = None
+
 
-        # Draw the sprites
-        for pipe in self.pipes:
-            pipe.draw()
-        self.base.draw()
-        self.player.draw()
+    def save_positions(self):
+        """
+        Get the current positions of the bird, base and pipes.
 
-        # Draw any messages
-        self.game_text.draw(mode)
+        Returns:
+            tuple: (bird y-coordinate, base x-coordinate, pipe x-coordinates)
+        """
+        pipe_x = {id(pipe): pipe.x for pipe in self.sim.pipes}
+        return self.sim.player.y, self.sim.base.x, pipe_x
 
-        # Update the entire game display
-        pygame.display.flip()
+
+    def restore_positions(self, positions):
+        """
+        Move the bird, base and pipes back to saved positions.
+
+        Arguments:
+            positions (tuple): positions from save_positions()
+        """
+        self.sim.player.y, self.sim.base.x, pipe_x = positions
+        for pipe in self.sim.pipes:
+            pipe.x = pipe_x[id(pipe)]
+
+
+    def check_actions(self, actions):
+        """
+        Handle the actions every screen shares: show or hide the profiler
+        overlay when p is pressed, and redraw the window when it's uncovered.
+
+        Arguments:
+            actions (int): bitmask of actions pressed (see controls.py)
+        """
+        if actions & PROFILER and self.profiler.enabled:
+            self.profiler.toggle_overlay()
+        if actions & EXPOSED:
+            if self.presenter is not None:
+                # The last scaled frame is still on the window, so it only
+                # needs showing again, not redrawing or rescaling
+                pygame.display.flip()
+            else:
+                # Only what changed is redrawn, so everything has to count as
+                # changed
+                self.renderer.invalidate()
 
 
     def welcome_loop(self):
         """
         Show the welcome screen.
         """
-        while True:
+        def update():
             # This loop listens for events (input from user). If the user 
             # presses the space bar, exit the welcome_loop and begin the game.
-            keys_pressed = listen()
-            if 'spacebar' in keys_pressed:
-                return
-            if 'left_arrow' or 'right_arrow' in keys_pressed:
-                self.level = self.game_text.update_level(keys_pressed)
+            self.profiler.begin_frame()
+            actions = self.input.take()
+            self.check_actions(actions)
+            self.profiler.mark(LISTEN)
+            if actions & FLAP:
+                return False
+            self.level = self.game_text.update_level(actions)
 
             # Update player sprite, which should be oscillating up and down
-            # and flappying its wings periodically
-            self.player.update()
+            # and flappying its wings periodically. The base sprite should be
+            # scrolling past.
+            self.last_positions = self.save_positions()
+            self.sim.idle()
+            self.profiler.mark(UPDATE)
+            return True
 
-            # Update the base sprite, which should be scrolling past.
-            self.base.update()
+        # Update the display in between
+        self.scheduler.run(update, lambda alpha: self.update_display('welcome', alpha))
 
-            # Update the display
-            self.update_display('welcome')
-            
-            # Increment the clock
-            self.clock.tick(self.fps)
 
-
-    def main_loop(self):
+    def main_loop(self, policy=None):
         """
         The main game loop. 
 
@@ -114,69 +309,148 @@ class Game():
         sprite through the pipe pairs. Bird movement is controlled using the 
         space bar. The game ends when the bird hits an obstacle (a pipe pair or 
         the ground).
-        """
-        # Tell bird sprite the game has started. It will stop oscillating.
-        self.player.set_game_play_mode(True)
 
-        # Start with two pipes off screen
-        self.pipes = [Pipe(self.width*1.5, self.level), Pipe(self.width*2, self.level)] 
-
-        # Start the game
-        while True:
+        Arguments:
+            policy (callable): optionally control the bird from code instead
+                of the space bar. Called with the simulation every frame, and
+                returns whether or not the bird should flap.
+        """
+        # Start game play. The bird stops oscillating and the first pipes are
+        # placed off screen.
+        self.recording = Recording(self.seed, self.level, self.sim.idle_frames,
+                                   width=self.width, height=self.height)
+        self.sim.start(self.level)
+        started = time.perf_counter()
+        last_frame = started
+        frames = 0
+
+        def update():
+            # Time since the last frame
+            nonlocal last_frame, frames
+            now = time.perf_counter()
+            if frames == len(self.frame_times):
+                self.frame_times = np.concatenate([self.frame_times, np.zeros(frames)])
+            self.frame_times[frames] = now - last_frame
+            last_frame = now
+            frames += 1
 
             # Check for key presses (user input). 
-            spacebar_press = False
-            keys_pressed = listen()
-            if 'spacebar' in keys_pressed:
-                spacebar_press = True
-
-            # Check to see if the player bird has collided with any of the pipe
-            # pairs or the base. If so, exit the game loop.
-            obstacles = self.pipes + [self.base]
-            if self.player.check_collide(obstacles):
-                return
-
-            # If the player passes through a pipe, add +1 to score
-            for i in range(len(self.pipes)):
-                if not self.pipe_counted[i]:
-                    if self.pipes[i].x < self.player.x:
-                        self.game_text.update_score() 
-                        self.pipe_counted[i] = True
-
-            # Update base sprite
-            self.base.update()
-
-            # Update player sprite
-            self.player.update(spacebar_press)
-
-            # Update pipes
-            for pipe in self.pipes:
-                pipe.update() 
-
-            # Add a new pipe when one of the pipes has shifted off screen
-            if self.pipes[0].x < 0 and len(self.pipes) < 3:
-                self.pipes.append(Pipe(self.width+50, self.level))
-                self.pipe_counted.append(False)
-
-            # Remove pipe that has shifted left off screen
-            if self.pipes[0].x < -self.pipes[0].image.get_width():
-                self.pipes.pop(0)
-                self.pipe_counted.pop(0)
-
-            # Update the game display
-            self.update_display('main')
-
-            # Increment
-            self.clock.tick(self.fps)
-
+            self.profiler.begin_frame()
+            actions = self.input.take()
+            self.check_actions(actions)
+            spacebar_press = bool(actions & FLAP)
+            if policy is not None:
+                spacebar_press = policy(self.sim)
+            self.recording.append(spacebar_press)
+            self.profiler.mark(LISTEN)
+
+            # Advance the game by one frame. If the player bird has collided 
+            # with any of the pipe pairs or the base, exit the game loop.
+            self.last_positions = self.save_positions()
+            if not self.sim.step(spacebar_press):
+                return False
+            self.game_text.score = self.sim.score
+            return True
+
+        # Update the game display in between
+        self.scheduler.run(update, lambda alpha: self.update_display('main', alpha))
+
+        # Save the recording of the game
+        self.recording.score = self.sim.score
+        if self.record_path is not None:
+            self.recording.save(self.record_path)
+
+        # Save the game, and ask for the leaderboard to show on the game over
+        # screen
+        if self.sessions is not None:
+            frame_time = None
+            if frames > 1:
+                # The first frame comes straight after the start, so it
+                # isn't counted
+                p50, p95, p99 = np.percentile(self.frame_times[1:frames] * 1000,
+                                              [50, 95, 99]).tolist()
+                frame_time = {'p50': p50, 'p95': p95, 'p99': p99}
+            self.sessions.add(self.level, self.sim.score, self.sim.frames,
+                              time.perf_counter() - started, self.seed, frame_time)
+            self.sessions.request_leaderboard(self.level, score=self.sim.score)
+
+
+    def population_loop(self, n, policy=None):
+        """
+        Fly a whole population of birds through the same pipe course, until
+        every bird has crashed (see population.Population).
 
-    def game_over(self):
+        Arguments:
+            n (int): number of birds
+            policy (callable): controls the birds. Called with the population
+                every frame, and returns a boolean array over all n birds
+                (by id) of whether or not each bird should flap. Without a
+                policy, the space bar makes every bird flap.
+
+        Returns:
+            np.ndarray: final score of each bird
+        """
+        self.sim = Population(n, self.width, self.height, self.level,
+                              random.Random(self.seed))
+        self.sim.start(self.level)
+        self.game_text.score = 0
+
+        # The birds are drawn where they are, never interpolated
+        self.last_positions = None
+
+        def update():
+            actions = self.input.take()
+            self.check_actions(actions)
+            if policy is not None:
+                flaps = policy(self.sim)
+            else:
+                flaps = np.full(n, bool(actions & FLAP))
+            if not self.sim.step(flaps):
+                return False
+            self.game_text.score = self.sim.score
+            return True
+
+        self.scheduler.run(update, lambda alpha: self.update_display('main', alpha))
+        return self.sim.player.scores
+
+
+    def game_over(self, timeout=1000, restart_delay=500, poll=30):
         """
         The game over loop.
-        Display the player's final score and the "Game Over" message.
+        Display the player's final score and the "Game Over" message, until
+        the player presses the space bar to play again.
+
+        The screen doesn't change by itself, so rather than redrawing it over
+        and over, the loop sleeps until an event comes in (or the timeout
+        passes) and only redraws what changed.
+
+        Arguments:
+            timeout (int): longest time to sleep for, in milliseconds
+            restart_delay (int): time before the space bar restarts the game,
+                in milliseconds, so a flap pressed just as the bird crashed
+                doesn't skip the screen
+            poll (int): time between checks for the leaderboard while it's
+                being read, in milliseconds
         """
+        ready = time.perf_counter() + restart_delay / 1000
+        self.check_actions(self.input.take())
+        self.update_display('game_over')
+
+        # The leaderboard is read in the background. Until it comes in, wake
+        # up every so often to check for it.
+        waiting = self.sessions is not None
         while True:
-            listen()
+            event = pygame.event.wait(poll if waiting else timeout)
+            if waiting and self.sessions.leaderboard(self.level) is not None:
+                waiting = False
+                self.update_display('game_over')
+            if event.type == NOEVENT:
+                continue
+            self.input.receive([event] + pygame.event.get())
+            actions = self.input.take()
+            if actions & FLAP and time.perf_counter() >= ready:
+                return
+            self.check_actions(actions)
             self.update_display('game_over')
 
 
@@ -184,6 +458,8 @@ class Game():
 # Script entry point
 if __name__ == '__main__':
     g = Game()
-    g.welcome_loop()
-    g.main_loop()
-    g.game_over()
\ No newline at end of file
+    while True:
+        g.welcome_loop()
+        g.main_loop()
+        g.game_over()
+        g.new_game()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import numpy as np
+import pygame
+
+from assets import load_image
+from game_text import GameText
+from renderer import Renderer
+
+
+# Weights of the red, green and blue channels in the brightness of a pixel
+GRAY_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+class PixelObserver():
+
+    def __init__(self, width=288, height=512, size=(84, 84), stack=4, grayscale=True):
+        """
+        Initialize a pixel observer, which draws the game for bots that learn
+        from pixels.
+
+        The game is drawn offscreen (no window is needed, so this works with
+        the SDL dummy video driver) into a surface whose pixels live in a
+        NumPy array, so the frame can be read without copying it out. Each
+        frame is then scaled down and turned to grayscale into a ring buffer
+        of the last few frames. Every array is allocated up front, so
+        observing allocates no new frames.
+
+        Arguments:
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+            size (tuple): (width, height) of the observations
+            stack (int): number of frames in each observation
+            grayscale (bool): whether to turn the frames to grayscale, rather
+                than keeping their RGB channels
+        """
+        pygame.display.init()
+        self.size = size
+        self.stack = stack
+        self.grayscale = grayscale
+
+        # Full size frame, as rows of RGBX pixels shared with the surface the
+        # game is drawn onto
+        self.frame = np.zeros((height, width, 4), dtype=np.uint8)
+        self.surface = pygame.image.frombuffer(self.frame, (width, height), 'RGBX')
+
+        # RGB view of the frame, e.g. for saving it or showing it
+        self.pixels = self.frame[:, :, :3]
+
+        # The frame scaled down, again shared with a surface
+        obs_width, obs_height = size
+        self.small = np.zeros((obs_height, obs_width, 4), dtype=np.uint8)
+        self.small_surface = pygame.image.frombuffer(self.small, size, 'RGBX')
+
+        # Brightness of the scaled down frame, and a scratch array for
+        # working it out
+        self.gray = np.zeros((obs_height, obs_width), dtype=np.float32)
+        self.scratch = np.zeros((obs_height, obs_width), dtype=np.float32)
+
+        # Ring buffer of the latest frames. Every frame is written twice, at
+        # slot i and at slot i+stack, so the latest frames are always next to
+        # each other somewhere in the buffer, and the stacked observation is
+        # just a slice of it.
+        shape = (obs_height, obs_width) if grayscale else (obs_height, obs_width, 3)
+        self.ring = np.zeros((2*stack,) + shape, dtype=np.uint8)
+        self.count = 0
+
+        # The game is drawn the same way as on screen, but nothing is shown
+        self.game_text = GameText(self.surface)
+        self.renderer = Renderer(self.surface, load_image('background'),
+                                 present=lambda dirty: None)
+
+
+    def reset(self, sim, mode='main'):
+        """
+        Start observing a new game. Every frame of the first observation is
+        the game's first frame.
+
+        Arguments:
+            sim (Simulation): the game
+            mode (str): Can be one of [welcome, main, game_over]
+
+        Returns:
+            np.ndarray: the observation (see observe())
+        """
+        self.renderer.invalidate()
+        self.count = 0
+        self.observe(sim, mode)
+        self.ring[:] = self.ring[0]
+        return self.ring[1:1 + self.stack]
+
+
+    def observe(self, sim, mode='main'):
+        """
+        Draw the game's current frame and add it to the latest frames.
+
+        The observation is a view of the ring buffer, so it is overwritten by
+        later frames. Copy it to keep it around.
+
+        Arguments:
+            sim (Simulation): the game
+            mode (str): Can be one of [welcome, main, game_over]
+
+        Returns:
+            np.ndarray: (stack, height, width) array of the latest frames,
+                oldest first, or (stack, height, width, 3) if not grayscale
+        """
+        # Only the parts of the frame that changed are redrawn
+        self.game_text.score = sim.score
+        self.renderer.draw(sim, self.game_text, mode)
+        pygame.transform.smoothscale(self.surface, self.size, self.small_surface)
+
+        slot = self.count % self.stack
+        if self.grayscale:
+            np.multiply(self.small[:, :, 0], np.float32(GRAY_WEIGHTS[0]), out=self.gray)
+            for channel in (1, 2):
+                np.multiply(self.small[:, :, channel], np.float32(GRAY_WEIGHTS[channel]),
+                            out=self.scratch)
+                self.gray += self.scratch
+            np.copyto(self.ring[slot], self.gray, casting='unsafe')
+        else:
+            self.ring[slot] = self.small[:, :, :3]
+        self.ring[slot + self.stack] = self.ring[slot]
+        self.count += 1
+        return self.ring[slot + 1:slot + 1 + self.stack]
+
+
+    def latest(self):
+        """
+        Get the latest observation again, without drawing a new frame.
+
+        Returns:
+            np.ndarray: the observation (see observe())
+        """
+        slot = (self.count - 1) % self.stack
+        return self.ring[slot + 1:slot + 1 + self.stack]
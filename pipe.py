@@ -4,53 +4,117 @@ import pygame
 from pygame.locals import *
 from pygame.sprite import Sprite
 
+from assets import load_image
+from collision import pipe_rects
+
+
+def gap_size(difficulty):
+    """
+    Get the size of the gap between the upper and lower pipe.
+
+    Arguments:
+        difficulty (int): either 'easy', 'medium', or 'hard' = [0,1,2]
+
+    Returns:
+        int: size of the gap (in pixels)
+    """
+    if difficulty == 0:
+        return 125
+    elif difficulty == 1:
+        return 100
+    elif difficulty == 2:
+        return 75
+
+
+def midpoint_range(screen_height):
+    """
+    Get the range that the midpoint of a pipe gap is randomly drawn from.
+
+    Arguments:
+        screen_height (int): height of the game screen (in pixels)
+
+    Returns:
+        range: all possible midpoint y-coordinates
+    """
+    return range(int(0.5*screen_height), int(0.65*screen_height))
+
+
+def gap_bounds(gap, midpoint):
+    """
+    Get the screen position of a pipe pair's gap.
+
+    The pipe pair is laid out the way it always has been: both pipes are
+    placed within a screen height tall pair whose top sits at the y-coordinate
+    of the upper pipe. The pair is cut off at its top and bottom edges.
+
+    Arguments:
+        gap (int): size of the gap between the upper and lower pipe (in pixels)
+        midpoint (int): y-coordinate of the middle of the gap
+
+    Returns:
+        tuple: y-coordinates of the (top of the pipe pair, top of the gap,
+            bottom of the gap)
+    """
+    pipe_height = load_image('pipe').get_height()
+    y_upper = int(midpoint - pipe_height - gap/2)
+    y_lower = int(midpoint + gap/2)
+    return y_upper, 2*y_upper + pipe_height, y_upper + y_lower
+
 
 class Pipe(Sprite):
 
-    def __init__(self, x_init, difficulty):
+    def __init__(self, x_init, difficulty, screen_height, rng=random,
+                 midpoint=None):
         """
         Initialize a new pipe pair sprite instance. 
         The pipe placement on the y-axis is randomly generated.
 
+        A pipe pair is stored as just its position and the bounds of its gap.
+        The pipe images and masks are shared between all pipes.
+
         Arguments:
             x_init (int): x-coordinate of starting position 
             difficulty (int): either 'easy', 'medium', or 'hard' = [0,1,2]. 
                 Will determine the size of the gaps between pipes.
+            screen_height (int): height of the game screen (in pixels)
+            rng (random.Random): random number generator for the pipe 
+                placement. Uses the global one by default.
+            midpoint (int): optionally place the middle of the gap here,
+                rather than randomly
         """
-        # Game surface
-        self.surface = pygame.display.get_surface()
-        screen_height = self.surface.get_height()
+        # Size of the pipe pair
+        self.width = load_image('pipe').get_width()
+        self.height = screen_height
+
+        # Randomly generate coordinates for upper and lwer pipe
+        if midpoint is None:
+            midpoint = rng.randrange(int(0.5*screen_height), 
+                                     int(0.65*screen_height))
+        self.place(x_init, gap_size(difficulty), midpoint)
 
+
+    def place(self, x, gap, midpoint):
+        """
+        Move the pipe pair to a new position, with a new gap. Pipe pairs are
+        reused this way once they've gone off screen (see course.PipeRing).
+
+        Arguments:
+            x (int): x-coordinate of the pipe pair
+            gap (int): size of gap between pipes (in pixels)
+            midpoint (int): y-coordinate of the middle of the gap
+        """
         # Pipe position 
-        self.x = x_init
+        self.x = x
 
         # Size of gap between pipes (in pixels)
-        if difficulty == 0:
-            self.gap = 125
-        elif difficulty == 1:
-            self.gap = 100
-        elif difficulty == 2:
-            self.gap = 75
-
-        # Sprite images
-        pipe_lower = pygame.image.load('assets/pipe.png').convert_alpha()
-        pipe_upper = pygame.transform.rotate(pipe_lower, 180)
-        pipe_width = pipe_lower.get_width()
-        pipe_height = pipe_lower.get_height()
+        self.gap = gap
 
-        # Randomly generate coordinates for upper and lwer pipe
-        midpoint = random.randrange(int(0.5*screen_height), 
-                                    int(0.65*screen_height))
-        y_upper = midpoint - pipe_height - self.gap/2
-        y_lower = midpoint + self.gap/2
-        self.y = y_upper
+        # Coordinates of the upper and lower pipe
+        self.midpoint = midpoint
+        self.y, self.gap_top, self.gap_bottom = gap_bounds(gap, midpoint)
 
-        # Create surface and mask
-        self.image = pygame.Surface((pipe_width, screen_height)).convert_alpha()
-        self.image.fill((0, 0, 0, 0))
-        self.image.blit(pipe_lower, (0, y_lower))
-        self.image.blit(pipe_upper, (0, y_upper))
-        self.mask = pygame.mask.from_surface(self.image)
+        # Whether or not the bird passing this pipe pair has been counted
+        self.scored = False
 
 
     def update(self):
@@ -61,15 +125,40 @@ class Pipe(Sprite):
         self.x -= 4
 
 
-    def draw(self):
+    def draw(self, surface):
         """
         Draw the sprite to the game display.
+
+        Arguments:
+            surface (pygame.Surface): surface to draw onto
+        """
+        pipe_lower = load_image('pipe')
+        pipe_upper = load_image('pipe', 180)
+        pipe_height = pipe_lower.get_height()
+
+        # Both pipes are cut off at the edges of the pipe pair
+        y_upper = self.gap_top - pipe_height
+        clip_upper = max(self.y - y_upper, 0)
+        surface.blit(pipe_upper, (self.x, y_upper + clip_upper),
+                     (0, clip_upper, self.width, pipe_height - clip_upper))
+        clip_lower = max(self.gap_bottom + pipe_height - (self.y + self.height), 0)
+        surface.blit(pipe_lower, (self.x, self.gap_bottom),
+                     (0, 0, self.width, pipe_height - clip_lower))
+
+
+    def solid_rects(self):
+        """
+        Get the solid parts of the pipe pair, for collision checks.
+
+        Returns:
+            list: (x0, y0, x1, y1) tuples in screen coordinates
         """
-        self.surface.blit(self.image, (self.x, self.y))
+        return pipe_rects(int(self.x), self.y, self.y + self.height,
+                          self.gap_top, self.gap_bottom)
 
     @property
     def rect(self):
         """
-        This property is needed for pygame.sprite.collide_mask
+        This property is needed for collision checks
         """
-        return Rect(self.x, self.y, self.image.get_width(), self.image.get_height())
\ No newline at end of file
+        return Rect(self.x, self.y, self.width, self.height)
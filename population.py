@@ -0,0 +1,272 @@
+import numpy as np
+from pygame.locals import *
+
+from simulation import Simulation
+from batch import sprite_tables, sat_hits
+
+
+class Flock():
+
+    def __init__(self, n, bird, screen_height):
+        """
+        Initialize a flock of birds.
+
+        The state of every bird is held in NumPy arrays (one array per
+        attribute of Bird), and the birds all follow the Bird rules together.
+        All birds fly at the same x-coordinate. Birds that crash are dropped
+        from the arrays, so dead birds cost nothing from then on.
+
+        Arguments:
+            n (int): number of birds
+            bird (Bird): a bird, to take the rules and sprites from
+            screen_height (int): height of the game screen (in pixels)
+        """
+        self.n = n
+        self.x = bird.x
+        self.height = screen_height
+
+        # Bird rules
+        self.y_init = bird.y_init
+        self.velocity_init = bird.velocity_y
+        self.angle_threshold = bird.angle_threshold
+        self.angle_flap = bird.angle_flap
+        self.rate_of_rotation = bird.rate_of_rotation
+        self.velocity_flap = bird.velocity_flap
+        self.velocity_terminal = bird.velocity_terminal
+
+        # Bird sprites, looked up as sprite_index[flap_state, angle]
+        masks, self.sprite_index, self.sprite_size, self.sprite_sat = sprite_tables(bird)
+        images = {id(mask): image for rotations in bird.sprites
+                  for image, mask in rotations.values()}
+        self.sprite_images = [images[id(mask)] for mask in masks]
+
+        # Final score and number of frames survived of every bird, by id.
+        # Birds still flying have a score of -1.
+        self.scores = np.full(n, -1, dtype=np.int64)
+        self.frames = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+
+    def reset(self):
+        """
+        Bring every bird back to life at its starting position.
+        """
+        self.ids = np.arange(self.n)
+        self.y = np.full(self.n, float(self.y_init))
+        self.velocity_y = np.full(self.n, self.velocity_init, dtype=np.int64)
+        self.angle = np.zeros(self.n, dtype=np.int64)
+        self.count = np.zeros(self.n, dtype=np.int64)
+        self.flap_state = np.zeros(self.n, dtype=np.int64)
+        self.scores[:] = -1
+        self.frames[:] = 0
+        self.update_visible()
+
+
+    def set_game_play_mode(self, is_playing):
+        """
+        Start game play (see Bird.set_game_play_mode). Birds in a flock never
+        idle, so this just puts every bird back at its starting position.
+
+        Arguments:
+            is_playing (bool): whether or not we are in game play mode
+        """
+        if is_playing:
+            self.reset()
+
+
+    def __len__(self):
+        """
+        Number of birds still flying.
+        """
+        return len(self.ids)
+
+
+    def check_collide(self, pipes, base):
+        """
+        Check every bird against the pipes and the base, all at once.
+        Like Bird.check_collide, this is pixel exact.
+
+        Arguments:
+            pipes (iterable): the pipe pairs
+            base (Base): the base
+
+        Returns:
+            np.ndarray: boolean array, True where the bird has collided
+        """
+        rects = [rect for pipe in pipes for rect in pipe.solid_rects()]
+        rects.extend(base.solid_rects())
+        rects = np.array(rects, dtype=np.int64)
+        sprite = self.sprite_index[self.flap_state, self.angle]
+        x_off = -int(self.x)
+        y_off = -np.trunc(self.y).astype(np.int64)[:, None]
+        return sat_hits(self.sprite_sat[sprite], self.sprite_size[sprite],
+                        rects, x_off, y_off)
+
+
+    def drop(self, dead, score, frames):
+        """
+        Take birds that have crashed out of the flock.
+
+        Arguments:
+            dead (np.ndarray): boolean array, True for birds to drop
+            score (int): the score the birds finished with
+            frames (int): the number of frames the birds survived
+        """
+        if not dead.any():
+            return
+        self.scores[self.ids[dead]] = score
+        self.frames[self.ids[dead]] = frames
+        alive = ~dead
+        self.ids = self.ids[alive]
+        self.y = self.y[alive]
+        self.velocity_y = self.velocity_y[alive]
+        self.angle = self.angle[alive]
+        self.count = self.count[alive]
+        self.flap_state = self.flap_state[alive]
+
+
+    def update(self, flaps=None):
+        """
+        Update every bird, following the same rules as Bird.update in game
+        play.
+
+        Arguments:
+            flaps (np.ndarray): boolean array over all n birds (by id), True
+                where the bird flaps its wings. Entries of dropped birds are
+                ignored.
+        """
+        if flaps is None:
+            flap = np.zeros(len(self.ids), dtype=bool)
+        else:
+            flap = np.asarray(flaps, dtype=bool)[self.ids]
+
+        # Update the angle (see Bird.update_angle)
+        self.angle = np.where(flap, self.angle_flap,
+                              np.maximum(self.angle - self.rate_of_rotation,
+                                         self.angle_threshold))
+
+        # Update the velocity (see Bird.update_velocity) and position
+        self.velocity_y = np.where(flap, self.velocity_flap,
+                                   np.minimum(self.velocity_y + 1, self.velocity_terminal))
+        self.y += self.velocity_y
+
+        # Every 5 frames, change the wing flap (see Bird.change_flap_state)
+        change = self.count % 5 == 0
+        self.flap_state[change] = self.count[change] % self.sprite_index.shape[0]
+        self.count += 1
+
+        self.update_visible()
+
+
+    def update_visible(self):
+        """
+        Work out which birds need drawing. Birds off the screen are skipped,
+        and birds that look exactly the same and are in exactly the same spot
+        are only drawn once.
+        """
+        y = np.trunc(self.y).astype(np.int64)
+        sprite = self.sprite_index[self.flap_state, self.angle]
+        on_screen = (y + self.sprite_size[sprite, 1] > 0) & (y < self.height)
+
+        # Each bird's look and position, packed into a single number
+        num_sprites = len(self.sprite_images)
+        keys = np.unique((y[on_screen] + self.height) * num_sprites + sprite[on_screen])
+        self.visible_y = keys // num_sprites - self.height
+        self.visible_sprite = keys % num_sprites
+        self.appearance = keys.tobytes()
+
+
+    @property
+    def rect(self):
+        """
+        Area covering every bird that is drawn.
+        """
+        if len(self.visible_y) == 0:
+            return Rect(self.x, 0, 0, 0)
+        size = self.sprite_size[self.visible_sprite]
+        top = self.visible_y.min()
+        bottom = (self.visible_y + size[:, 1]).max()
+        return Rect(self.x, int(top), int(size[:, 0].max()), int(bottom - top))
+
+
+    def draw(self, surface):
+        """
+        Draw the birds onto the game display.
+
+        Arguments:
+            surface (pygame.Surface): surface to draw onto
+        """
+        images = self.sprite_images
+        x = self.x
+        surface.blits([(images[s], (x, y)) for s, y in
+                       zip(self.visible_sprite.tolist(), self.visible_y.tolist())],
+                      doreturn=False)
+
+
+class Population(Simulation):
+
+    def __init__(self, n, width=288, height=512, level=2, rng=None,
+                 difficulty=None):
+        """
+        Initialize a population of birds, all flying through the same pipe
+        course, e.g. for evolving bots.
+
+        This is a Simulation where the single bird is replaced by a Flock.
+        The game goes on until every bird has crashed, and the score is that
+        of the birds still flying (all birds fly at the same x-coordinate, so
+        they pass the pipes together).
+
+        Arguments:
+            n (int): number of birds
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            rng (random.Random): random number generator for the pipe
+                placement. Uses the global one by default.
+            difficulty (callable): optional difficulty curve (see Simulation)
+        """
+        Simulation.__init__(self, width, height, level, rng, difficulty)
+        self.player = Flock(n, self.player, height)
+
+
+    def idle(self):
+        """
+        Advance the welcome screen by one frame. The base scrolls past.
+        """
+        self.base.update()
+        self.idle_frames += 1
+
+
+    def step(self, flaps=None):
+        """
+        Advance game play by one frame (see Simulation.step).
+
+        Arguments:
+            flaps (np.ndarray): boolean array over all birds (by id), True
+                where the bird flaps its wings this frame
+
+        Returns:
+            bool: False once every bird has crashed, True otherwise
+        """
+        flock = self.player
+
+        # Drop any birds that have collided with the pipes or the base
+        flock.drop(flock.check_collide(self.pipes, self.base), self.score, self.frames)
+        if len(flock) == 0:
+            self.done = True
+            return False
+
+        # If the birds pass through a pipe, add +1 to score
+        for pipe in self.pipes:
+            if not pipe.scored:
+                if pipe.x < flock.x:
+                    self.score += 1
+                    pipe.scored = True
+
+        # Update the birds, and move the base and pipes along
+        flock.update(flaps)
+        self.scroll()
+
+        self.frames += 1
+        return True
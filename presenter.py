@@ -0,0 +1,118 @@
+import pygame
+from pygame.locals import *
+
+
+# Scaling filters: pixelated ('nearest') or blended ('smooth')
+FILTERS = {
+    'nearest': pygame.transform.scale,
+    'smooth': pygame.transform.smoothscale,
+}
+
+
+class ScaledPresenter():
+
+    def __init__(self, logical_size, window_size=None, fullscreen=False,
+                 scale_filter='nearest'):
+        """
+        Initialize a scaled display.
+
+        The game is drawn at its logical size (the size of the art) onto an
+        offscreen surface, which is then scaled up to fill the window,
+        keeping its shape, with black bars on the sides if needed. Only the
+        parts of the frame that were redrawn get scaled again, so drawing
+        costs the same as at the logical size, and static screens cost
+        nothing at all: the last scaled frame stays on the window.
+
+        With the 'nearest' filter, the game is scaled by a whole number, so
+        every pixel of the art becomes a square block of the same size, and
+        scaling part of the frame gives exactly the same pixels as scaling
+        all of it. The 'smooth' filter fills more of the window, but the
+        edges of each scaled part can come out very slightly different.
+
+        Arguments:
+            logical_size (tuple): (width, height) the game is drawn at
+            window_size (tuple): (width, height) of the window. Defaults to
+                the size of the monitor in fullscreen, and to the logical size
+                otherwise.
+            fullscreen (bool): whether or not to go fullscreen
+            scale_filter (str): one of 'nearest' or 'smooth'
+        """
+        if scale_filter not in FILTERS:
+            raise ValueError('Unknown scaling filter %r' % scale_filter)
+        self.scale_filter = scale_filter
+        self.scale_function = FILTERS[scale_filter]
+
+        if window_size is None:
+            window_size = (0, 0) if fullscreen else logical_size
+        self.window = pygame.display.set_mode(window_size, FULLSCREEN if fullscreen else 0)
+
+        # Offscreen surface the game is drawn onto. It has the same pixel
+        # format as the window, so it can be scaled straight onto it.
+        self.surface = pygame.Surface(logical_size).convert(self.window)
+
+        # Fit the game into the window
+        width, height = logical_size
+        window_width, window_height = self.window.get_size()
+        self.scale = min(window_width / width, window_height / height)
+        if scale_filter == 'nearest' and self.scale >= 1:
+            self.scale = int(self.scale)
+        self.offset = (int((window_width - width * self.scale) / 2),
+                       int((window_height - height * self.scale) / 2))
+
+        # Black bars around the game
+        self.window.fill((0, 0, 0))
+
+
+    def to_window(self, rect):
+        """
+        Get where an area of the game ends up on the window.
+        Each edge is rounded down, so neighbouring areas line up exactly.
+
+        Arguments:
+            rect (pygame.Rect): area of the game, in logical pixels
+
+        Returns:
+            pygame.Rect: the area on the window
+        """
+        x, y = self.offset
+        left, top = int(rect.left * self.scale), int(rect.top * self.scale)
+        right, bottom = int(rect.right * self.scale), int(rect.bottom * self.scale)
+        return Rect(x + left, y + top, right - left, bottom - top)
+
+
+    def present(self, dirty):
+        """
+        Scale the areas of the game that were redrawn onto the window, and
+        update those parts of the display.
+
+        Arguments:
+            dirty (list): the pygame.Rect areas of the game that were redrawn
+        """
+        bounds = self.surface.get_rect()
+        updated = []
+        for rect in dirty:
+            target = self.to_window(rect)
+            if target.width <= 0 or target.height <= 0:
+                continue
+            if self.scale_filter == 'smooth':
+                # Smooth scaling blends in the neighbouring pixels, so scale
+                # the pixels around the area too, and then only copy over the
+                # area itself
+                padded = rect.inflate(4, 4).clip(bounds)
+                padded_target = self.to_window(padded)
+                scaled = self.scale_function(self.surface.subsurface(padded),
+                                             padded_target.size)
+                self.window.blit(scaled, target,
+                                 target.move(-padded_target.x, -padded_target.y))
+            else:
+                self.scale_function(self.surface.subsurface(rect), target.size,
+                                    self.window.subsurface(target))
+            updated.append(target)
+        pygame.display.update(updated)
+
+
+    def refresh(self):
+        """
+        Scale the whole game onto the window again.
+        """
+        self.present([self.surface.get_rect()])
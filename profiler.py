@@ -0,0 +1,189 @@
+import atexit
+import time
+
+import numpy as np
+
+from game_text import text_panel
+
+
+# Phases of a frame, and their columns in the timings
+PHASES = ['listen', 'collision', 'update', 'spawn', 'display']
+LISTEN, COLLISION, UPDATE, SPAWN, DISPLAY = range(len(PHASES))
+
+
+class FrameProfiler():
+
+    def __init__(self, enabled=False, size=900, export_path=None):
+        """
+        Initialize the frame profiler.
+
+        The game loops mark the end of each phase of a frame (listening for
+        input, collisions, sprite updates, pipe spawning and drawing), and the
+        time spent in each phase is kept for the last few hundred frames in a
+        fixed size ring buffer. When disabled, marking a phase returns
+        straight away.
+
+        Arguments:
+            enabled (bool): whether or not to record timings
+            size (int): number of frames to keep timings for
+            export_path (str): optionally save the timings to this CSV file
+                when the program exits
+        """
+        self.enabled = enabled
+        self.size = size
+
+        # Ring buffer of timings in seconds: one row per frame, with a column
+        # per phase, and a last column for the time since the previous frame
+        self.timings = np.zeros((size, len(PHASES) + 1))
+
+        # Total number of frames recorded
+        self.count = 0
+
+        # Timings of the frame in progress
+        self.current = [0.0] * len(PHASES)
+        self.frame_start = None
+        self.last = 0.0
+
+        # Optional input queue (see controls.py), whose key press latencies
+        # are reported along with the frame timings
+        self.input = None
+
+        # On-screen overlay, and the frame count it was last drawn at
+        self.show_overlay = False
+        self.overlay_image = None
+        self.overlay_count = 0
+
+        if export_path is not None:
+            atexit.register(self.export, export_path)
+
+
+    def begin_frame(self):
+        """
+        Finish the last frame, adding it to the ring buffer, and start timing
+        a new one.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            row = self.timings[self.count % self.size]
+            row[:-1] = self.current
+            row[-1] = now - self.frame_start
+            self.count += 1
+            self.current = [0.0] * len(PHASES)
+        self.frame_start = now
+        self.last = now
+
+
+    def resume(self):
+        """
+        Start timing again after a pause (e.g. waiting for the next frame),
+        without counting the pause towards any phase.
+        """
+        if self.enabled:
+            self.last = time.perf_counter()
+
+
+    def mark(self, phase):
+        """
+        Mark the end of a phase. The time since the last mark is added to it.
+
+        Arguments:
+            phase (int): one of the phase constants (LISTEN, COLLISION, ...)
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+
+    def recorded(self):
+        """
+        Get the recorded timings, oldest frame first.
+
+        Returns:
+            np.ndarray: (frames, phases + 1) timings in seconds
+        """
+        if self.count < self.size:
+            return self.timings[:self.count]
+        start = self.count % self.size
+        return np.concatenate([self.timings[start:], self.timings[:start]])
+
+
+    def stats(self):
+        """
+        Summarize the recorded timings.
+
+        Returns:
+            dict: frame count, percentiles of the frame time (time since the
+            previous frame) and of the busy time (time spent in all phases),
+            and the mean time of each phase, all in milliseconds. With an
+            input queue, also the percentiles of the time from a key press to
+            it being shown on screen (input_latency).
+        """
+        timings = self.recorded() * 1000
+        stats = {'frames': len(timings)}
+        if len(timings) == 0:
+            return stats
+        busy = timings[:, :-1].sum(axis=1)
+        for name, values in [('frame_time', timings[:, -1]), ('busy', busy)]:
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+            stats[name] = {'p50': p50, 'p95': p95, 'p99': p99, 'max': float(values.max())}
+        stats['phases'] = dict(zip(PHASES, timings[:, :-1].mean(axis=0).tolist()))
+        if self.input is not None and self.input.count:
+            stats['input_latency'] = self.input.stats()['to_display']
+        return stats
+
+
+    def export(self, path):
+        """
+        Save the recorded timings to a CSV file, in milliseconds.
+
+        Arguments:
+            path (str): file to write
+        """
+        np.savetxt(path, self.recorded() * 1000, fmt='%.4f', delimiter=',',
+                   header=','.join(PHASES + ['frame_time']), comments='')
+
+
+    def toggle_overlay(self):
+        """
+        Show or hide the on-screen overlay.
+        """
+        self.show_overlay = not self.show_overlay
+        self.overlay_image = None
+
+
+    def overlay(self, refresh=15):
+        """
+        Get the on-screen overlay with the frame time percentiles and the
+        phase breakdown. The text is only redrawn every few frames, as
+        drawing it every frame would show up in the timings.
+
+        Arguments:
+            refresh (int): number of frames between redraws
+
+        Returns:
+            pygame.Surface: the overlay, or None if it is hidden
+        """
+        if not (self.enabled and self.show_overlay):
+            return None
+        if self.overlay_image is not None and self.count - self.overlay_count < refresh:
+            return self.overlay_image
+
+        stats = self.stats()
+        lines = ['frames %i' % stats['frames']]
+        if stats['frames']:
+            for name in ['frame_time', 'busy', 'input_latency']:
+                if name not in stats:
+                    continue
+                lines.append('%s p50 %.1f p95 %.1f p99 %.1f ms' % (
+                    name, stats[name]['p50'], stats[name]['p95'], stats[name]['p99']))
+            for phase, mean in stats['phases'].items():
+                lines.append('  %-9s %.2f ms' % (phase, mean))
+
+        image = text_panel(lines)
+        self.overlay_image = image
+        self.overlay_count = self.count
+        return image
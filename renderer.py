@@ -0,0 +1,196 @@
+import pygame
+from pygame.locals import *
+
+
+def merge_rects(rects):
+    """
+    Merge overlapping rectangles together, so no area is drawn twice.
+
+    Arguments:
+        rects (list): pygame.Rect instances
+
+    Returns:
+        list: pygame.Rect instances that don't overlap
+    """
+    merged = []
+    for rect in rects:
+        if rect.width <= 0 or rect.height <= 0:
+            continue
+        rect = Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class Renderer():
+
+    def __init__(self, screen, background, present=None):
+        """
+        Initialize the renderer.
+
+        Rather than redrawing and flipping the whole screen every frame, the
+        renderer keeps track of what has changed since the last frame and only
+        redraws and updates those parts of the screen.
+
+        Arguments:
+            screen (pygame.Surface): surface to draw the game onto
+            background (pygame.Surface): the background image
+            present (callable): shows the areas of the screen that were
+                redrawn, given a list of pygame.Rect. By default, the screen
+                is the display and those parts of it are updated.
+        """
+        self.screen = screen
+        self.present = present if present is not None else pygame.display.update
+
+        # The background is opaque, so keep it without per-pixel alpha and in
+        # the screen's pixel format, which makes blitting it a straight copy
+        self.background = background.convert(screen)
+
+        # The ground strip is the background with the base drawn on top. The
+        # base only scrolls through a few positions, so there is one strip
+        # per position of the base.
+        self.ground = {}
+
+        # What each object looked like and where it was in the last frame,
+        # keyed by object
+        self.last_state = {}
+
+        # HUD state in the last frame. Anything that changes it needs the
+        # whole screen to be redrawn.
+        self.last_hud = None
+
+        # Surfaces drawn on top of everything, stacked down from the top left
+        # corner, such as the profiler overlay and the leaderboard
+        self.overlays = []
+
+
+    def invalidate(self):
+        """
+        Redraw the whole screen on the next frame (e.g. after the window was
+        covered up).
+        """
+        self.last_hud = None
+
+
+    def ground_strip(self, base):
+        """
+        Get the ground strip for the current position of the base.
+
+        Arguments:
+            base (Base): the base sprite
+
+        Returns:
+            pygame.Surface: background with the base drawn on top
+        """
+        if base.x not in self.ground:
+            width = self.screen.get_width()
+            height = base.image.get_height()
+            strip = pygame.Surface((width, height), 0, self.screen)
+            strip.blit(self.background, (0, 0), (0, base.y, width, height))
+            strip.blit(base.image, (base.x, 0))
+            self.ground[base.x] = strip
+        return self.ground[base.x]
+
+
+    def current_state(self, sim, game_text, mode):
+        """
+        Get where each object is on screen and what it looks like. If either
+        changes between frames, the object needs to be redrawn.
+
+        Arguments:
+            sim (Simulation): the game simulation
+            game_text (GameText): the game text
+            mode (str): One of 'welcome', 'main', or 'game_over'
+
+        Returns:
+            dict: (rects, appearance) of each object
+        """
+        player = sim.player
+        state = {}
+        for pipe in sim.pipes:
+            # Leave out the gap between the pipes
+            upper = Rect(pipe.x, pipe.y, pipe.width, pipe.gap_top - pipe.y)
+            lower = Rect(pipe.x, pipe.gap_bottom, pipe.width,
+                         pipe.y + pipe.height - pipe.gap_bottom)
+            state[id(pipe)] = ((upper, lower), None)
+        state['player'] = ((player.rect,), player.appearance)
+        state['base'] = ((sim.base.rect,), sim.base.x)
+        if mode != 'welcome':
+            state['score'] = ((game_text.score_rect(),), game_text.score)
+        for i, (overlay, rect) in enumerate(self.overlay_rects()):
+            state[('overlay', i)] = ((rect,), overlay)
+        return state
+
+
+    def overlay_rects(self):
+        """
+        Get where each overlay goes on screen, one under the other.
+
+        Returns:
+            list: (surface, pygame.Rect) of each overlay
+        """
+        rects = []
+        y = 0
+        for overlay in self.overlays:
+            rects.append((overlay, overlay.get_rect(topleft=(0, y))))
+            y += overlay.get_height()
+        return rects
+
+
+    def draw(self, sim, game_text, mode):
+        """
+        Draw a new frame, and update the parts of the display that changed.
+
+        Arguments:
+            sim (Simulation): the game simulation
+            game_text (GameText): the game text
+            mode (str): One of 'welcome', 'main', or 'game_over'
+
+        Returns:
+            list: the pygame.Rect areas of the display that were updated
+        """
+        screen_rect = self.screen.get_rect()
+        state = self.current_state(sim, game_text, mode)
+
+        # Find the areas that need to be redrawn: wherever an object was last
+        # frame and wherever it is now, if it has moved or changed
+        hud = (mode, game_text.level)
+        if hud != self.last_hud:
+            dirty = [screen_rect]
+        else:
+            dirty = []
+            for key in set(state) | set(self.last_state):
+                new = state.get(key)
+                old = self.last_state.get(key)
+                if new != old:
+                    for rects, _ in filter(None, [new, old]):
+                        dirty.extend(rect.clip(screen_rect) for rect in rects)
+            dirty = merge_rects(dirty)
+        self.last_state = state
+        self.last_hud = hud
+
+        # Redraw each area. Everything is drawn in the usual order, but
+        # clipped to the area, so only the pixels within it are touched.
+        ground = self.ground_strip(sim.base)
+        sky = Rect(0, 0, screen_rect.width, sim.base.y)
+        overlays = self.overlay_rects()
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.screen.blit(self.background, rect, rect.clip(sky))
+            for pipe in sim.pipes:
+                if pipe.rect.colliderect(rect):
+                    pipe.draw(self.screen)
+
+            # The base is opaque, so the ground strip hides anything behind it
+            self.screen.blit(ground, (0, sim.base.y))
+            sim.player.draw(self.screen)
+            game_text.draw(mode)
+            for overlay, overlay_rect in overlays:
+                self.screen.blit(overlay, overlay_rect)
+        self.screen.set_clip(None)
+
+        self.present(dirty)
+        return dirty
@@ -0,0 +1,195 @@
+import random
+import struct
+import sys
+
+from simulation import Simulation
+
+
+# Recording file header: magic bytes, format version, seed, level, number of
+# welcome screen frames, number of game play frames, final score, and screen
+# width and height
+HEADER = struct.Struct('<4sBQBIIIHH')
+MAGIC = b'FBRP'
+VERSION = 2
+
+# Header of version 1 recordings, which were always played at 288x512
+HEADER_V1 = struct.Struct('<4sBQBIII')
+
+
+class Recording():
+
+    def __init__(self, seed, level, idle_frames=0, flaps=b'', frames=0, score=0,
+                 width=288, height=512):
+        """
+        Initialize a recording of a game.
+
+        A game is fully determined by its seed, its level, how long the
+        welcome screen was up (which sets the bird's starting position and
+        wing flap), whether the bird flapped on each frame, and the screen
+        size (which sets where pipes are placed). The flaps are stored as a
+        bitstream, one bit per frame.
+
+        Arguments:
+            seed (int): seed for the pipe placement
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            idle_frames (int): number of frames on the welcome screen
+            flaps (bytes): flap bitstream, least significant bit first
+            frames (int): number of game play frames recorded
+            score (int): final score of the game
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+        """
+        self.seed = seed
+        self.level = level
+        self.idle_frames = idle_frames
+        self.flaps = bytearray(flaps)
+        self.frames = frames
+        self.score = score
+        self.width = width
+        self.height = height
+
+
+    def append(self, flap):
+        """
+        Record the input of the next frame.
+
+        Arguments:
+            flap (bool): whether or not the bird flapped its wings
+        """
+        if self.frames % 8 == 0:
+            self.flaps.append(0)
+        if flap:
+            self.flaps[-1] |= 1 << (self.frames % 8)
+        self.frames += 1
+
+
+    def flap(self, frame):
+        """
+        Get the recorded input of a frame.
+
+        Arguments:
+            frame (int): frame number, starting from 0
+
+        Returns:
+            bool: whether or not the bird flapped its wings
+        """
+        return bool(self.flaps[frame // 8] >> (frame % 8) & 1)
+
+
+    def to_bytes(self):
+        """
+        Encode the recording in the binary recording format.
+
+        Returns:
+            bytes: the encoded recording
+        """
+        header = HEADER.pack(MAGIC, VERSION, self.seed, self.level,
+                             self.idle_frames, self.frames, self.score,
+                             self.width, self.height)
+        return header + bytes(self.flaps)
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Decode a recording from the binary recording format.
+
+        Arguments:
+            data (bytes): the encoded recording
+
+        Returns:
+            Recording: the decoded recording
+        """
+        magic, version = struct.unpack_from('<4sB', data)
+        if magic != MAGIC:
+            raise ValueError('Not a flappy bird recording')
+        if version == VERSION:
+            header = HEADER
+            _, _, seed, level, idle_frames, frames, score, width, height = \
+                HEADER.unpack_from(data)
+        elif version == 1:
+            header = HEADER_V1
+            _, _, seed, level, idle_frames, frames, score = HEADER_V1.unpack_from(data)
+            width, height = 288, 512
+        else:
+            raise ValueError('Unsupported recording version %i' % version)
+        flaps = data[header.size:header.size + (frames + 7) // 8]
+        if len(flaps) * 8 < frames:
+            raise ValueError('Recording is truncated')
+        return cls(seed, level, idle_frames, flaps, frames, score, width, height)
+
+
+    def save(self, path):
+        """
+        Save the recording to a file.
+
+        Arguments:
+            path (str): file to write
+        """
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a recording from a file.
+
+        Arguments:
+            path (str): file to read
+
+        Returns:
+            Recording: the loaded recording
+        """
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def replay(recording):
+    """
+    Re-simulate a recorded game, headless and as fast as possible, at the
+    recorded screen size.
+
+    Arguments:
+        recording (Recording): the recorded game
+
+    Returns:
+        Simulation: the simulation at the end of the replay
+    """
+    sim = Simulation(recording.width, recording.height, recording.level,
+                     random.Random(recording.seed))
+    for i in range(recording.idle_frames):
+        sim.idle()
+    sim.start()
+    for frame in range(recording.frames):
+        if not sim.step(recording.flap(frame)):
+            break
+    return sim
+
+
+def verify(recording):
+    """
+    Check that a recording replays to the same result.
+    The bird must crash on exactly the last recorded frame, with the recorded
+    score.
+
+    Arguments:
+        recording (Recording): the recorded game
+
+    Returns:
+        bool: True if the replay matches the recording, False otherwise
+    """
+    sim = replay(recording)
+    return (sim.done and sim.score == recording.score
+            and sim.frames == recording.frames - 1)
+
+
+# Script entry point: verify a batch of recordings
+if __name__ == '__main__':
+    failed = 0
+    for path in sys.argv[1:]:
+        recording = Recording.load(path)
+        ok = verify(recording)
+        failed += not ok
+        print('%s: score %i %s' % (path, recording.score, 'ok' if ok else 'MISMATCH'))
+    sys.exit(1 if failed else 0)
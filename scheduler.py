@@ -0,0 +1,111 @@
+import time
+
+
+class FixedTimestep():
+
+    def __init__(self, tick_rate=30, fast_forward=False, render_every=1,
+                 render_rate=None, max_catch_up=5, wait=None):
+        """
+        Initialize a fixed timestep scheduler.
+
+        The game simulation always advances in fixed ticks, no matter how
+        often (or whether) frames are drawn, so game outcomes only depend on
+        the inputs and never on timing.
+
+        Arguments:
+            tick_rate (int): simulation ticks per second of game time
+            fast_forward (bool): if True, run ticks as fast as possible
+                instead of in real time
+            render_every (int): in fast forward mode, draw a frame every this
+                many ticks. 0 means never draw.
+            render_rate (int): in real time mode, frames drawn per second. By
+                default a frame is drawn after every tick. A higher rate (e.g.
+                for high refresh displays) draws extra frames in between
+                ticks, interpolated between the last two ticks.
+            max_catch_up (int): most ticks to run back to back when we've
+                fallen behind real time, before giving up on catching up
+            wait (callable): in real time mode, waits until the given time
+                (from time.perf_counter) between ticks and frames, e.g. while
+                listening for input. Sleeps by default.
+        """
+        self.tick_rate = tick_rate
+        self.fast_forward = fast_forward
+        self.render_every = render_every
+        self.render_rate = render_rate
+        self.max_catch_up = max_catch_up
+        self.wait = wait if wait is not None else self.sleep_until
+
+        # Total number of ticks run so far
+        self.ticks = 0
+
+
+    def sleep_until(self, until):
+        """
+        Sleep until a given time (from time.perf_counter).
+        """
+        time.sleep(max(until - time.perf_counter(), 0))
+
+
+    def run(self, update, render):
+        """
+        Run the loop until update() asks to stop.
+
+        Arguments:
+            update (callable): advances the game by one tick. Returns False to
+                stop the loop.
+            render (callable): draws a frame. Called with alpha (float), how
+                far along (from 0 to 1) the frame is from the previous tick
+                to the latest one.
+        """
+        if self.fast_forward:
+            self.run_fast(update, render)
+        else:
+            self.run_real_time(update, render)
+
+
+    def run_fast(self, update, render):
+        """
+        Run ticks back to back, as fast as possible.
+        """
+        while update():
+            self.ticks += 1
+            if self.render_every and self.ticks % self.render_every == 0:
+                render(1.0)
+
+
+    def run_real_time(self, update, render):
+        """
+        Run ticks at the tick rate, drawing frames in between.
+        """
+        tick_time = 1.0 / self.tick_rate
+        interpolate = self.render_rate is not None and self.render_rate > self.tick_rate
+        frame_time = 1.0 / self.render_rate if interpolate else tick_time
+
+        next_tick = time.perf_counter()
+        while True:
+            # Run any ticks that are due
+            now = time.perf_counter()
+            ticks = 0
+            while now >= next_tick:
+                if not update():
+                    return
+                self.ticks += 1
+                ticks += 1
+                next_tick += tick_time
+
+                # If we've fallen far behind (e.g. the window was dragged),
+                # skip ahead rather than running a burst of ticks
+                if ticks >= self.max_catch_up:
+                    next_tick = now + tick_time
+                    break
+
+            # Draw a frame, then wait for the next tick or frame
+            if interpolate:
+                alpha = 1.0 - (next_tick - time.perf_counter()) / tick_time
+                render(min(max(alpha, 0.0), 1.0))
+                wake = min(next_tick, time.perf_counter() + frame_time)
+            else:
+                if ticks:
+                    render(1.0)
+                wake = next_tick
+            self.wait(wake)
@@ -0,0 +1,350 @@
+"""
+Control server: lets agents in other processes (in any language) play the
+game over a Unix domain socket.
+
+The server runs a fixed set of headless games (see env.py), numbered from 0.
+Every request can address any number of them at once, so one round trip can
+reset, step or observe many games.
+
+Protocol (all values little-endian):
+
+    request:  op (u8), request id (u32), count (u16), then count entries of
+        RESET    game (u16), seed (u32)
+        STEP     game (u16), action (u8)
+        OBSERVE  game (u16)
+
+    reply:    status (u8), request id (u32), count (u16), latency (u32),
+              then count results of
+                  observation (5 x f32), reward (f32), done (u8), score (u32)
+              or, if the status is ERROR, a count byte long UTF-8 message
+
+The latency is the time the server spent on the request, in microseconds.
+Results come back in the same order as the entries of the request. Stepping a
+game that is over does nothing (its result has a reward of 0 and done set),
+until it is reset.
+
+Usage:
+    python server.py /tmp/flappy.sock [--games 64]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import sys
+import time
+
+# Keep pygame's banner out of the output
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+
+from env import FlappyBirdEnv
+
+
+# Request and reply headers
+REQUEST = struct.Struct('<BIH')
+REPLY = struct.Struct('<BIHI')
+
+# Operations
+RESET, STEP, OBSERVE = range(1, 4)
+
+# Reply status
+OK, ERROR = range(2)
+
+# Request entries of each operation, and the result sent back for each entry
+ENTRIES = {
+    RESET: np.dtype([('game', '<u2'), ('seed', '<u4')]),
+    STEP: np.dtype([('game', '<u2'), ('action', 'u1')]),
+    OBSERVE: np.dtype([('game', '<u2')]),
+}
+RESULT = np.dtype([('observation', '<f4', FlappyBirdEnv.observation_size),
+                   ('reward', '<f4'), ('done', 'u1'), ('score', '<u4')])
+
+
+class ControlServer():
+
+    def __init__(self, num_games, level=2, frame_skip=1, latency_size=10000):
+        """
+        Initialize a control server.
+
+        Requests are handled one at a time, in the order they come in, on a
+        single asyncio event loop, so games are never stepped concurrently.
+
+        Arguments:
+            num_games (int): number of games
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            frame_skip (int): number of game frames each step lasts
+            latency_size (int): number of requests to keep latencies for
+        """
+        self.envs = [FlappyBirdEnv(level, frame_skip) for i in range(num_games)]
+
+        # Ring buffer of the time spent on each request, in seconds
+        self.latencies = np.zeros(latency_size)
+        self.requests = 0
+
+        self.server = None
+
+
+    def handle(self, op, entries):
+        """
+        Carry out a request.
+
+        Arguments:
+            op (int): one of RESET, STEP or OBSERVE
+            entries (np.ndarray): the request entries
+
+        Returns:
+            np.ndarray: one RESULT for each entry
+        """
+        results = np.zeros(len(entries), dtype=RESULT)
+        games = entries['game'].tolist()
+
+        # Check every entry first, so a bad request changes nothing
+        for game in games:
+            if game >= len(self.envs):
+                raise ValueError('No game %i (there are %i)' % (game, len(self.envs)))
+            if op != RESET and self.envs[game].sim is None:
+                raise ValueError('Game %i has not been reset' % game)
+
+        if op == RESET:
+            for game, seed in zip(games, entries['seed'].tolist()):
+                self.envs[game].reset(seed)
+        elif op == STEP:
+            for i, (game, action) in enumerate(zip(games, entries['action'].tolist())):
+                # Stepping a game that is done does nothing
+                results['reward'][i] = self.envs[game].step(action)[1]
+
+        for i, game in enumerate(games):
+            env = self.envs[game]
+            results['observation'][i] = env.observe()
+            results['done'][i] = env.sim.done
+            results['score'][i] = env.sim.score
+        return results
+
+
+    async def serve_client(self, reader, writer):
+        """
+        Answer the requests of one client until it disconnects.
+
+        Arguments:
+            reader (asyncio.StreamReader): stream from the client
+            writer (asyncio.StreamWriter): stream to the client
+        """
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(REQUEST.size)
+                except asyncio.IncompleteReadError:
+                    break
+                op, request_id, count = REQUEST.unpack(header)
+                if op not in ENTRIES:
+                    # The size of the rest of the request is unknown, so
+                    # there is no way to carry on with this client
+                    message = ('Unknown operation %i' % op).encode()
+                    writer.write(REPLY.pack(ERROR, request_id, len(message), 0) + message)
+                    break
+                payload = await reader.readexactly(count * ENTRIES[op].itemsize)
+
+                start = time.perf_counter()
+                try:
+                    results = self.handle(op, np.frombuffer(payload, ENTRIES[op]))
+                    status, body = OK, results.tobytes()
+                except Exception as e:
+                    # Cut the message to fit the reply's count, without
+                    # splitting a character in two
+                    message = str(e).encode()[:0xffff]
+                    status, body = ERROR, message.decode(errors='ignore').encode()
+                latency = time.perf_counter() - start
+                self.latencies[self.requests % len(self.latencies)] = latency
+                self.requests += 1
+
+                count = len(results) if status == OK else len(body)
+                writer.write(REPLY.pack(status, request_id, count,
+                                        min(int(latency * 1e6), 0xffffffff)) + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+    def latency_stats(self):
+        """
+        Get statistics of the time spent on the latest requests.
+
+        Returns:
+            dict: number of requests, and the 50th, 90th and 99th percentile
+                and the longest latency, in milliseconds
+        """
+        latencies = self.latencies[:min(self.requests, len(self.latencies))]
+        if len(latencies) == 0:
+            return {'requests': 0}
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+        return {'requests': self.requests, 'p50': float(p50), 'p90': float(p90),
+                'p99': float(p99), 'max': float(latencies.max() * 1000)}
+
+
+    async def start(self, path):
+        """
+        Start listening on a Unix domain socket.
+
+        Arguments:
+            path (str): path of the socket. A socket left over at this path
+                is replaced.
+        """
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = await asyncio.start_unix_server(self.serve_client, path)
+
+
+    async def serve_forever(self, path):
+        """
+        Listen on a Unix domain socket and answer requests until cancelled.
+
+        Arguments:
+            path (str): path of the socket
+        """
+        await self.start(path)
+        async with self.server:
+            await self.server.serve_forever()
+
+
+class ControlClient():
+
+    def __init__(self, path):
+        """
+        Initialize a connection to a control server. Each call sends one
+        request and waits for its reply.
+
+        Arguments:
+            path (str): path of the server's socket
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.request_id = 0
+
+        # Time the server spent on the last request, in seconds
+        self.latency = 0.0
+
+
+    def request(self, op, entries):
+        """
+        Send a request and wait for the reply.
+
+        Arguments:
+            op (int): one of RESET, STEP or OBSERVE
+            entries (np.ndarray): the request entries
+
+        Returns:
+            np.ndarray: one RESULT for each entry
+        """
+        self.request_id = (self.request_id + 1) % 2**32
+        entries = np.asarray(entries, dtype=ENTRIES[op])
+        self.sock.sendall(REQUEST.pack(op, self.request_id, len(entries)) + entries.tobytes())
+
+        status, request_id, count, latency = REPLY.unpack(self.receive(REPLY.size))
+        self.latency = latency / 1e6
+        if status != OK:
+            raise RuntimeError(self.receive(count).decode())
+        return np.frombuffer(self.receive(count * RESULT.itemsize), RESULT)
+
+
+    def receive(self, size):
+        """
+        Read an exact number of bytes from the server.
+
+        Arguments:
+            size (int): number of bytes
+
+        Returns:
+            bytes: the data
+        """
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('Control server closed the connection')
+            data += chunk
+        return bytes(data)
+
+
+    def reset(self, games, seeds):
+        """
+        Start new games.
+
+        Arguments:
+            games (list): numbers of the games
+            seeds (list): seed for the pipe placement of each game
+
+        Returns:
+            np.ndarray: one RESULT for each game
+        """
+        entries = np.zeros(len(games), dtype=ENTRIES[RESET])
+        entries['game'], entries['seed'] = games, seeds
+        return self.request(RESET, entries)
+
+
+    def step(self, games, actions):
+        """
+        Step games, in the order given.
+
+        Arguments:
+            games (list): numbers of the games
+            actions (list): action of each game (1 = flap)
+
+        Returns:
+            np.ndarray: one RESULT for each game
+        """
+        entries = np.zeros(len(games), dtype=ENTRIES[STEP])
+        entries['game'], entries['action'] = games, actions
+        return self.request(STEP, entries)
+
+
+    def observe(self, games):
+        """
+        Get the current state of games, without changing them.
+
+        Arguments:
+            games (list): numbers of the games
+
+        Returns:
+            np.ndarray: one RESULT for each game (with a reward of 0)
+        """
+        entries = np.zeros(len(games), dtype=ENTRIES[OBSERVE])
+        entries['game'] = games
+        return self.request(OBSERVE, entries)
+
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self.sock.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# Script entry point
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flappy Bird control server')
+    parser.add_argument('path', help='path of the Unix domain socket')
+    parser.add_argument('--games', type=int, default=64)
+    parser.add_argument('--level', type=int, default=2)
+    parser.add_argument('--frame-skip', type=int, default=1)
+    args = parser.parse_args()
+
+    server = ControlServer(args.games, args.level, args.frame_skip)
+    print('Serving %i games on %s' % (args.games, args.path), file=sys.stderr)
+    try:
+        asyncio.run(server.serve_forever(args.path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print('Request latency (ms): %s' % server.latency_stats(), file=sys.stderr)
@@ -0,0 +1,266 @@
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from game_text import text_panel
+
+
+# Table of finished games, and the index leaderboards are read from: by
+# level, best score first, and the earliest game first among equal scores
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        started REAL NOT NULL,
+        level INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        frames INTEGER NOT NULL,
+        duration REAL NOT NULL,
+        seed INTEGER,
+        frame_mean REAL,
+        frame_p50 REAL,
+        frame_p95 REAL,
+        frame_p99 REAL)""",
+    """CREATE INDEX IF NOT EXISTS sessions_leaderboard
+        ON sessions (level, score DESC, started)""",
+]
+
+INSERT = """INSERT INTO sessions (started, level, score, frames, duration, seed,
+    frame_mean, frame_p50, frame_p95, frame_p99) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+TOP = """SELECT score, frames, seed, started FROM sessions
+    WHERE level = ? ORDER BY score DESC, started LIMIT ?"""
+
+RANK = """SELECT COUNT(*) + 1 FROM sessions WHERE level = ? AND score > ?"""
+
+# Leaderboard of a store that has failed
+FAILED = ([], None)
+
+
+class SessionStore():
+
+    def __init__(self, path='sessions.db', batch_size=256, flush_interval=0.5):
+        """
+        Initialize a store of finished games, kept in an SQLite database.
+
+        The database is only ever touched by a background thread. Games are
+        queued up and written in batches, each in a single transaction: once
+        batch_size games are waiting, or once no more have come in for
+        flush_interval seconds. Leaderboards are read on the same thread and
+        picked up later with leaderboard(), so the game never waits on the
+        disk.
+
+        Arguments:
+            path (str): database file
+            batch_size (int): most games written in one transaction
+            flush_interval (float): time to wait for more games before
+                writing out the ones waiting, in seconds
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Work for the background thread: ('session', row),
+        # ('leaderboard', (level, n, score)) or ('close', None)
+        self.pending = queue.Queue()
+
+        # Latest leaderboard of each level, as (rows, rank) once read
+        self.leaderboards = {}
+
+        # Number of games written, the first error hit, if any, and whether
+        # the background thread has given up (e.g. the database can't be
+        # opened)
+        self.written = 0
+        self.error = None
+        self.failed = False
+
+        # On-screen leaderboard, and the leaderboard it was drawn from
+        self.overlay_image = None
+        self.overlay_source = None
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def add(self, level, score, frames, duration, seed=None, frame_time=None,
+            started=None):
+        """
+        Queue up a finished game to be saved. Never blocks.
+
+        Arguments:
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            score (int): final score
+            frames (int): number of frames of game play
+            duration (float): length of game play, in seconds
+            seed (int): seed of the game's pipe placement
+            frame_time (dict): optional frame time percentiles, in
+                milliseconds, as {'p50': ..., 'p95': ..., 'p99': ...} (see
+                FrameProfiler.stats)
+            started (float): time the game started, as a Unix timestamp.
+                Defaults to the duration before now.
+        """
+        if self.failed:
+            return
+        if started is None:
+            started = time.time() - duration
+        frame_mean = duration * 1000 / frames if frames else None
+        if frame_time is None:
+            frame_time = {}
+        self.pending.put(('session', (
+            started, level, score, frames, duration, seed, frame_mean,
+            frame_time.get('p50'), frame_time.get('p95'), frame_time.get('p99'))))
+
+
+    def request_leaderboard(self, level, n=5, score=None):
+        """
+        Ask for the best scores of a level. The leaderboard is read once every
+        game queued before it has been saved; pick it up with leaderboard().
+
+        Arguments:
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            n (int): number of scores
+            score (int): optionally also find the rank of this score
+        """
+        self.leaderboards[level] = None
+        self.pending.put(('leaderboard', (level, n, score)))
+
+
+    def leaderboard(self, level):
+        """
+        Get the latest leaderboard read for a level.
+
+        Arguments:
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+
+        Returns:
+            tuple: (rows, rank), where rows are (score, frames, seed, started)
+                tuples, best first, and rank is the rank of the requested
+                score (or None). None if the leaderboard hasn't been read yet.
+                If the store has failed, there are no rows.
+        """
+        if self.failed:
+            return FAILED
+        return self.leaderboards.get(level)
+
+
+    def top(self, level, n=10):
+        """
+        Read the best scores of a level straight away, on the calling thread
+        (e.g. from scripts). Games still queued up aren't included.
+
+        Arguments:
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            n (int): number of scores
+
+        Returns:
+            list: (score, frames, seed, started) tuples, best first
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(TOP, (level, n)).fetchall()
+        finally:
+            connection.close()
+
+
+    def run(self):
+        """
+        Run the background thread. If it fails, no more games are taken, and
+        every leaderboard comes back empty, so nothing waits on it.
+        """
+        try:
+            self.serve()
+        except Exception as e:
+            self.error = e
+            self.failed = True
+
+
+    def serve(self):
+        """
+        Save games and read leaderboards as they're asked for.
+        """
+        connection = sqlite3.connect(self.path)
+        # Write-ahead logging lets top() read while games are being written,
+        # and only syncs to disk at checkpoints
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+
+        batch = []
+        while True:
+            try:
+                kind, item = self.pending.get(timeout=self.flush_interval if batch else None)
+            except queue.Empty:
+                kind, item = 'flush', None
+            if kind == 'session':
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+
+            # Anything other than a new game (or a full batch) writes out the
+            # games waiting first, so leaderboards include them
+            if batch:
+                try:
+                    with connection:
+                        connection.executemany(INSERT, batch)
+                    self.written += len(batch)
+                except sqlite3.Error as e:
+                    self.error = e
+                batch = []
+
+            if kind == 'leaderboard':
+                level, n, score = item
+                rows, rank = [], None
+                try:
+                    rows = connection.execute(TOP, (level, n)).fetchall()
+                    if score is not None:
+                        rank = connection.execute(RANK, (level, score)).fetchone()[0]
+                except sqlite3.Error as e:
+                    self.error = e
+                self.leaderboards[level] = (rows, rank)
+            elif kind == 'close':
+                break
+        connection.close()
+
+
+    def overlay(self, level):
+        """
+        Get an on-screen leaderboard for a level, once it has been read.
+
+        Arguments:
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+
+        Returns:
+            pygame.Surface: the leaderboard, or None if it hasn't been read
+        """
+        leaderboard = self.leaderboard(level)
+        if leaderboard is None or leaderboard is FAILED:
+            return None
+        if leaderboard is self.overlay_source:
+            return self.overlay_image
+
+        rows, rank = leaderboard
+        lines = ['Best scores']
+        for i, row in enumerate(rows):
+            lines.append('%i.  %i' % (i + 1, row[0]))
+        if rank is not None:
+            lines.append('You: #%i' % rank)
+
+        image = text_panel(lines, 20)
+        self.overlay_image = image
+        self.overlay_source = leaderboard
+        return image
+
+
+    def close(self):
+        """
+        Save any games still queued up, and stop the background thread.
+        """
+        if self.thread is not None:
+            self.pending.put(('close', None))
+            self.thread.join()
+            self.thread = None
+            if self.error is not None:
+                print('Saving games failed: %s' % self.error, file=sys.stderr)
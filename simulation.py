@@ -0,0 +1,272 @@
+import random
+from collections import namedtuple
+
+from bird import Bird
+from base import Base
+from course import Course, PipeRing
+from profiler import COLLISION, UPDATE, SPAWN
+
+
+# Complete state of a simulation at one point in time (see
+# Simulation.snapshot). The bird is (y, velocity_y, angle, count, flap_state,
+# game_play), and each pipe pair is (x, gap, midpoint, scored), oldest first.
+SimulationState = namedtuple('SimulationState', [
+    'level', 'score', 'done', 'idle_frames', 'frames', 'bird', 'base_x',
+    'pipes', 'course_index', 'rng_state'])
+
+
+class Simulation():
+
+    def __init__(self, width=288, height=512, level=2, rng=None, difficulty=None):
+        """
+        Initialize the game simulation.
+        This holds all of the game logic (bird physics, pipe and base
+        scrolling, scoring and collisions) and never touches the display, so
+        it can run headless. The Game class draws on top of it.
+
+        Arguments:
+            width (int): width of game screen in pixels
+            height (int): height of game screen in pixels
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            rng (random.Random): random number generator for the pipe
+                placement. Uses the global one by default.
+            difficulty (callable): optional difficulty curve, giving the gap
+                size of each pipe from its number (see course.progressive).
+                Overrides the level's gap size.
+        """
+        self.width, self.height = width, height
+        self.level = level
+        self.rng = rng if rng is not None else random
+        self.difficulty = difficulty
+
+        # Set up game objects
+        self.player = Bird(0.2*width, 0.45*height)
+        self.base = Base(width, height)
+
+        # Pipes on screen, which are reused as they go off screen, and the
+        # course they are placed along
+        self.pipes = PipeRing(height)
+        self.course = None
+
+        # Game state
+        self.score = 0
+        self.done = False
+
+        # Number of frames on the welcome screen and in game play so far
+        self.idle_frames = 0
+        self.frames = 0
+
+        # Optional FrameProfiler, timing the phases of each frame
+        self.profiler = None
+
+        # Last state of the random number generator captured by snapshot(),
+        # as (course index, state). The generator only moves on when the
+        # course draws from it, so the state is kept until then.
+        self.rng_cache = None
+
+
+    def start(self, level=None):
+        """
+        Start game play.
+        The bird stops oscillating and the first two pipes are placed off
+        screen.
+
+        Arguments:
+            level (int): optionally change the game difficulty
+        """
+        if level is not None:
+            self.level = level
+
+        # Tell bird sprite the game has started. It will stop oscillating.
+        self.player.set_game_play_mode(True)
+
+        # Start with two pipes off screen
+        self.new_course()
+        self.pipes.clear()
+        self.spawn_pipe(self.width*1.5)
+        self.spawn_pipe(self.width*2)
+
+
+    def new_course(self):
+        """
+        Set up the pipe course for the current level (or difficulty curve).
+        """
+        difficulty = self.difficulty if self.difficulty is not None else self.level
+        self.course = Course(difficulty, self.height, self.rng)
+        self.rng_cache = None
+
+
+    def spawn_pipe(self, x):
+        """
+        Place the next pipe pair of the course.
+
+        Arguments:
+            x (int): x-coordinate of the pipe pair
+        """
+        gap, midpoint = next(self.course)
+        self.pipes.spawn(x, gap, midpoint)
+
+
+    def idle(self):
+        """
+        Advance the welcome screen by one frame. The bird oscillates and the
+        base scrolls past.
+        """
+        self.player.update()
+        self.base.update()
+        self.idle_frames += 1
+
+
+    def step(self, flap=False):
+        """
+        Advance game play by one frame.
+
+        Arguments:
+            flap (bool): whether or not the bird flaps its wings this frame
+
+        Returns:
+            bool: False if the bird has crashed, True otherwise
+        """
+        # Check to see if the player bird has collided with any of the pipe
+        # pairs or the base. If so, the game is over.
+        profiler = self.profiler
+        if self.player.check_collide(self.pipes) or self.player.check_collide(self.base):
+            self.done = True
+            return False
+        if profiler is not None:
+            profiler.mark(COLLISION)
+
+        # If the player passes through a pipe, add +1 to score
+        for pipe in self.pipes:
+            if not pipe.scored:
+                if pipe.x < self.player.x:
+                    self.score += 1
+                    pipe.scored = True
+
+        # Update player sprite
+        self.player.update(flap)
+
+        # Move the base and pipes along
+        self.scroll()
+
+        self.frames += 1
+        return True
+
+
+    def scroll(self):
+        """
+        Scroll the base and pipes along by one frame, placing the next pipe
+        of the course once there's room for it.
+        """
+        profiler = self.profiler
+
+        # Update base and pipes
+        self.base.update()
+        for pipe in self.pipes:
+            pipe.update()
+        if profiler is not None:
+            profiler.mark(UPDATE)
+
+        # Add a new pipe when one of the pipes has shifted off screen
+        if self.pipes[0].x < 0 and len(self.pipes) < 3:
+            self.spawn_pipe(self.width+50)
+
+        # Remove pipe that has shifted left off screen, so it can be reused
+        if self.pipes[0].x < -self.pipes[0].width:
+            self.pipes.popleft()
+        if profiler is not None:
+            profiler.mark(SPAWN)
+
+
+    def next_pipe(self):
+        """
+        Get the next pipe pair the bird has to get through.
+
+        Returns:
+            Pipe: the first pipe pair the bird hasn't fully passed yet, or None
+        """
+        for pipe in self.pipes:
+            if pipe.x + pipe.width > self.player.x:
+                return pipe
+        return None
+
+
+    def snapshot(self):
+        """
+        Capture the complete state of the game, including the position of
+        the random number generator, e.g. to try out moves and then roll back.
+
+        The snapshot is a small immutable value (only numbers, no sprites), so
+        it can be kept, shared between branches of a search, and restored any
+        number of times.
+
+        Returns:
+            SimulationState: the state of the game
+        """
+        player = self.player
+        return SimulationState(
+            self.level, self.score, self.done, self.idle_frames, self.frames,
+            (player.y, player.velocity_y, player.angle, player.count,
+             player.flap_state, player.game_play),
+            self.base.x,
+            tuple((pipe.x, pipe.gap, pipe.midpoint, pipe.scored) for pipe in self.pipes),
+            self.course.index if self.course is not None else None,
+            self.rng_state())
+
+
+    def rng_state(self):
+        """
+        Get the state of the random number generator.
+
+        Capturing it is most of the cost of a snapshot, so it's only captured
+        again once the course has drawn from the generator. This relies on
+        nothing else drawing from it, so the global generator (which anything
+        can use) is captured every time.
+
+        Returns:
+            tuple: the state, from random.Random.getstate()
+        """
+        index = self.course.index if self.course is not None else None
+        if self.rng is random or self.rng_cache is None or self.rng_cache[0] != index:
+            self.rng_cache = (index, self.rng.getstate())
+        return self.rng_cache[1]
+
+
+    def restore(self, state):
+        """
+        Put the game back into a state captured by snapshot(). The sprites are
+        kept as they are and just moved back, so nothing is copied or loaded.
+
+        Arguments:
+            state (SimulationState): the state to go back to
+        """
+        if state.level != self.level:
+            self.level = state.level
+            self.course = None
+        self.score = state.score
+        self.done = state.done
+        self.idle_frames = state.idle_frames
+        self.frames = state.frames
+
+        player = self.player
+        (player.y, player.velocity_y, player.angle, player.count,
+         player.flap_state, player.game_play) = state.bird
+        self.base.x = state.base_x
+
+        self.pipes.clear()
+        for x, gap, midpoint, scored in state.pipes:
+            self.pipes.spawn(x, gap, midpoint).scored = scored
+
+        # The random number generator is left alone if it's already in the
+        # snapshot's state
+        cache = self.rng_cache
+        if (self.rng is random or cache is None or cache[1] is not state.rng_state
+                or cache[0] != (self.course.index if self.course is not None else None)):
+            self.rng.setstate(state.rng_state)
+        if state.course_index is None:
+            self.course = None
+        else:
+            if self.course is None:
+                self.new_course()
+            self.course.index = state.course_index
+        self.rng_cache = (state.course_index, state.rng_state)
@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+
+from batch import BatchSimulation, MAX_PIPES
+from simulation import Simulation
+
+
+class ListRandom():
+    """
+    Stand-in random number generator that hands out a fixed list of pipe
+    midpoints, so a Simulation can be given the same pipes as a game in the
+    batch.
+    """
+
+    def __init__(self, midpoints):
+        self.midpoints = iter(midpoints)
+
+    def randrange(self, start, stop):
+        return next(self.midpoints)
+
+
+def policy(sim, rng):
+    """
+    Flap near the bottom of the next gap, with a few random flaps, so the
+    games last a while and end at different times.
+    """
+    player = sim.player
+    pipe = sim.next_pipe()
+    if pipe is None:
+        return rng.random() < 0.08
+    return player.y > pipe.gap_bottom - 44 or rng.random() < 0.01
+
+
+def test_batch_matches_simulation():
+    """
+    Every game of a BatchSimulation follows a Simulation given the same
+    pipes and the same flaps, frame for frame, up to and including its crash.
+    """
+    n, frames, level = 12, 1500, 1
+    rng = random.Random(0)
+    batch = BatchSimulation(n, level=level)
+    start, stop = batch.midpoints.start, batch.midpoints.stop
+    midpoints = [[rng.randrange(start, stop) for i in range(200)] for game in range(n)]
+    sims = []
+    for game in range(n):
+        sim = Simulation(level=level, rng=ListRandom(midpoints[game]))
+        sim.start()
+        sims.append(sim)
+
+    # Hand each game in the batch its own midpoints, in the same order as
+    # its Simulation. Games restarted after their crash get any midpoint.
+    feeds = [iter(m) for m in midpoints]
+    playing = np.ones(n, dtype=bool)
+
+    def random_midpoints(shape):
+        if isinstance(shape, tuple):
+            # Starting games: two pipes each, plus an unused slot
+            if playing.all() and shape[0] == n:
+                return np.array([[next(f), next(f), 0] for f in feeds])
+            return np.full(shape, start)
+        # Spawning pipes, in the games batch.step() picks
+        rows = np.arange(n)
+        head_x = batch.pipe_x[rows, batch.pipe_head]
+        spawn = ~batch.done & (head_x < 0) & (batch.pipe_count < MAX_PIPES)
+        return np.array([next(feeds[g]) if playing[g] else start for g in rows[spawn]])
+
+    batch.random_midpoints = random_midpoints
+    batch.reset()
+
+    flap_rngs = [random.Random(game) for game in range(n)]
+    for frame in range(frames):
+        actions = np.zeros(n, dtype=bool)
+        for game in np.flatnonzero(playing):
+            sim = sims[game]
+            assert (batch.y[game], batch.velocity_y[game], batch.angle[game],
+                    batch.score[game]) == (sim.player.y, sim.player.velocity_y,
+                                           sim.player.angle, sim.score), (game, frame)
+            actions[game] = policy(sim, flap_rngs[game])
+        _, dones, scores = batch.step(actions)
+        for game in np.flatnonzero(playing):
+            alive = sims[game].step(actions[game])
+            assert dones[game] == (not alive), (game, frame)
+            assert scores[game] == sims[game].score, (game, frame)
+            if not alive:
+                playing[game] = False
+        if not playing.any():
+            break
+
+    # Games ended at different times, so restarted games ran alongside
+    assert not playing.all()
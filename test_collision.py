@@ -0,0 +1,52 @@
+import random
+
+import pygame
+
+from bird import Bird
+from pipe import Pipe
+
+
+class MaskSprite(pygame.sprite.Sprite):
+    """
+    A pipe pair drawn onto its own transparent surface, for checking against
+    pygame.sprite.collide_mask.
+    """
+
+    def __init__(self, pipe, margin=100):
+        super().__init__()
+        surface = pygame.Surface((pipe.width + 2*margin, pipe.height + 2*margin),
+                                 pygame.SRCALPHA)
+        x, y = pipe.x, pipe.y
+        pipe.x, pipe.y = margin, margin
+        pipe.gap_top += margin - y
+        pipe.gap_bottom += margin - y
+        pipe.draw(surface)
+        pipe.x, pipe.y = x, y
+        pipe.gap_top -= margin - y
+        pipe.gap_bottom -= margin - y
+        self.mask = pygame.mask.from_surface(surface)
+        self.rect = surface.get_rect(topleft=(x - margin, y - margin))
+
+
+def test_collide_matches_collide_mask():
+    """
+    collide() gives the same answer as pygame.sprite.collide_mask, for random
+    placements of the bird near the pipes.
+    """
+    rng = random.Random(0)
+    bird = Bird(0, 0)
+    hits = 0
+    for i in range(2000):
+        pipe = Pipe(rng.randrange(-40, 300), rng.randrange(3), 512, rng)
+        bird.x = pipe.x + rng.randrange(-50, pipe.width + 10)
+        bird.y = rng.choice([pipe.gap_top, pipe.gap_bottom]) + rng.randrange(-40, 40)
+        bird.flap_state = rng.randrange(4)
+        bird.angle = rng.choice(bird.angles)
+
+        expected = bool(pygame.sprite.collide_mask(bird, MaskSprite(pipe)))
+        placement = (pipe.x, pipe.midpoint, pipe.gap, bird.x, bird.y, bird.angle)
+        assert bird.check_collide(pipe) == expected, placement
+        hits += expected
+
+    # Both outcomes were checked plenty of times
+    assert 200 < hits < 1800
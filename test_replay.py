@@ -0,0 +1,85 @@
+import os
+import random
+
+# Play the recorded games without a window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from main import Game
+from replay import Recording, verify
+
+
+def flapper(seed):
+    """
+    Get a policy that flaps near the bottom of the next gap (or low down
+    before the first pipe), with some random flaps so games end.
+    """
+    rng = random.Random(seed)
+
+    def policy(sim):
+        pipe = sim.next_pipe()
+        if pipe is None:
+            return sim.player.y > 330
+        return sim.player.y > pipe.gap_bottom - 44 or rng.random() < 0.02
+
+    return policy
+
+
+def record(path, seed, level, idle_frames, width=288, height=512):
+    """
+    Record a game played by flapper(seed), at full speed.
+
+    Returns:
+        Recording: the recording saved by the game
+    """
+    game = Game(width, height, fast_forward=True, render_every=0, seed=seed,
+                record_path=str(path))
+    game.level = level
+    for i in range(idle_frames):
+        game.sim.idle()
+    game.main_loop(policy=flapper(seed))
+    return Recording.load(str(path))
+
+
+def test_recorded_games_verify(tmp_path):
+    """
+    Games recorded by the game replay to the same result, on every level, at
+    the default and at another screen size.
+    """
+    for size in [(288, 512), (400, 700)]:
+        for seed in range(6):
+            recording = record(tmp_path / 'game.fbr', seed, seed % 3, seed, *size)
+            assert (recording.width, recording.height) == size
+            assert recording.frames > 0
+            assert verify(recording), (size, seed)
+
+
+def test_tampered_recordings_fail(tmp_path):
+    """
+    Changing anything that decides the game makes the recording fail to
+    verify.
+    """
+    recording = record(tmp_path / 'game.fbr', 3, 0, 3, 400, 700)
+    assert recording.score > 0 and verify(recording)
+    data = recording.to_bytes()
+
+    # Round trip through the binary format
+    decoded = Recording.from_bytes(data)
+    assert decoded.to_bytes() == data and verify(decoded)
+
+    changes = [
+        ('score', recording.score + 1),
+        ('frames', recording.frames - 1),
+        ('seed', recording.seed + 1),
+        ('level', (recording.level + 1) % 3),
+        ('height', 512),
+    ]
+    for name, value in changes:
+        tampered = Recording.from_bytes(data)
+        setattr(tampered, name, value)
+        assert not verify(tampered), name
+
+    # Flapping on a different frame changes the game too
+    tampered = Recording.from_bytes(data)
+    tampered.flaps[len(tampered.flaps) // 2] ^= 1
+    assert not verify(tampered)
@@ -0,0 +1,95 @@
+import random
+
+from simulation import Simulation
+
+
+def policy(sim, rng):
+    """
+    Flap near the bottom of the next gap, with a few random flaps.
+    """
+    pipe = sim.next_pipe()
+    if pipe is None:
+        return rng.random() < 0.08
+    return sim.player.y > pipe.gap_bottom - 44 or rng.random() < 0.01
+
+
+def play(sim, seed, frames):
+    """
+    Play a game on for a number of frames (or until the bird crashes),
+    keeping track of everything that happens.
+
+    Returns:
+        list: the bird's position, the score and the pipes on every frame
+    """
+    rng = random.Random(seed)
+    trajectory = []
+    for frame in range(frames):
+        alive = sim.step(policy(sim, rng))
+        trajectory.append((sim.player.y, sim.player.velocity_y, sim.player.angle,
+                           sim.score, sim.snapshot().pipes))
+        if not alive:
+            break
+    return trajectory
+
+
+def start(seed, level=1, idle_frames=7):
+    sim = Simulation(level=level, rng=random.Random(seed))
+    for i in range(idle_frames):
+        sim.idle()
+    sim.start()
+    return sim
+
+
+def test_restore_replays_the_same_game():
+    """
+    Restoring a snapshot and playing on gives the same game, however many
+    times, whatever was played in between, and on another Simulation.
+    """
+    best_score = 0
+    for seed in range(5):
+        sim = start(seed)
+        play(sim, seed, 60)
+        assert not sim.done
+        state = sim.snapshot()
+
+        # Play a few different games on from the snapshot
+        branches = []
+        for branch in range(4):
+            sim.restore(state)
+            assert sim.snapshot() == state
+            branches.append((play(sim, branch, 3000), sim.snapshot()))
+            best_score = max(best_score, sim.score)
+        assert len(set(len(trajectory) for trajectory, end in branches)) > 1
+
+        # Each one replays exactly, in another order, and on a different game
+        fresh = start(seed + 1000, idle_frames=0)
+        for branch in reversed(range(len(branches))):
+            trajectory, end = branches[branch]
+            for game in [sim, fresh]:
+                game.restore(state)
+                assert play(game, branch, 3000) == trajectory
+                assert game.snapshot() == end
+
+    # Some games went on long enough for new pipes to be placed (drawing from
+    # the random number generator)
+    assert best_score >= 5
+
+
+def test_restore_finished_game():
+    """
+    A snapshot of a crashed game restores as crashed, and a snapshot from
+    before the crash brings the bird back.
+    """
+    sim = start(0)
+    state = sim.snapshot()
+    while sim.step(False):
+        pass
+    crashed = sim.snapshot()
+    assert crashed.done
+
+    sim.restore(state)
+    assert not sim.done
+    assert sim.step(False)
+
+    sim.restore(crashed)
+    assert sim.done and sim.snapshot() == crashed
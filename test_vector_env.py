@@ -0,0 +1,23 @@
+import numpy as np
+
+from vector_env import SubprocVectorEnv
+
+
+def test_arrays_outlive_close():
+    """
+    The arrays returned by reset() and step() are views of the shared memory,
+    and must stay readable after the env is closed.
+    """
+    env = SubprocVectorEnv(4, num_workers=2, seed=0)
+    obs = env.reset()
+    first = obs.copy()
+    observations, rewards, dones, scores = env.step(np.zeros(4, dtype=np.int8))
+    latest = observations.copy()
+    env.close()
+
+    # obs and observations are the same shared array, so both hold the
+    # latest step
+    assert np.array_equal(obs, latest)
+    assert np.array_equal(observations[1:3], latest[1:3])
+    assert rewards.shape == dones.shape == scores.shape == (4,)
+    assert first.shape == latest.shape
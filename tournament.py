@@ -0,0 +1,316 @@
+"""
+Policy tournament: play many seeded games with each policy, headless and in
+parallel, and compare their scores.
+
+Policies are the same callables Game.main_loop() takes: called with the
+simulation every frame, they return whether or not the bird should flap. They
+run in worker processes, so they must be importable functions (not lambdas).
+
+Usage:
+    python tournament.py module:policy module:policy [--seeds 200]
+"""
+import argparse
+import importlib
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+
+# Keep pygame's banner out of the JSON output
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+
+from simulation import Simulation
+
+
+def play(task):
+    """
+    Play one game with a policy. Runs in a worker process.
+
+    Arguments:
+        task (tuple): (policy name, policy, level, seed, max_frames)
+
+    Returns:
+        dict: the policy name, level, seed, score, number of frames survived,
+            and whether or not the bird crashed (rather than running out of
+            frames)
+    """
+    name, policy, level, seed, max_frames = task
+    sim = Simulation(level=level, rng=random.Random(seed))
+    sim.start()
+    while sim.frames < max_frames and sim.step(policy(sim)):
+        pass
+    return {'policy': name, 'level': level, 'seed': seed, 'score': sim.score,
+            'frames': sim.frames, 'crashed': sim.done}
+
+
+def summarize(results, max_frames, z=1.96, survival_points=21):
+    """
+    Get score statistics for a set of games. Games on several levels are
+    treated as strata: the confidence interval only counts the spread of the
+    scores within each level.
+
+    Arguments:
+        results (list): game results from play()
+        max_frames (int): longest a game was allowed to run
+        z (float): z-score of the confidence interval (1.96 for 95%)
+        survival_points (int): number of points on the survival curve
+
+    Returns:
+        dict: number of games, mean score with its confidence interval, score
+            percentiles, and the survival curve: the fraction of games still
+            going after each number of frames, as [frames, fraction] pairs
+    """
+    scores = np.array([r['score'] for r in results], dtype=float)
+    frames = np.array([r['frames'] for r in results])
+    levels = np.array([r['level'] for r in results])
+    n = len(scores)
+    mean = scores.mean()
+
+    # Standard error of the mean, level by level, so the difference between
+    # the levels' scores doesn't count as noise
+    variance = 0.0
+    for level in np.unique(levels):
+        level_scores = scores[levels == level]
+        if len(level_scores) < 2:
+            variance = math.inf
+            break
+        weight = len(level_scores) / n
+        variance += weight**2 * level_scores.var(ddof=1) / len(level_scores)
+    half_width = z * math.sqrt(variance)
+    p10, p25, p50, p75, p90 = np.percentile(scores, [10, 25, 50, 75, 90]).tolist()
+    checkpoints = np.linspace(0, max_frames, survival_points).astype(int)
+    survival = [[int(t), float((frames >= t).mean())] for t in checkpoints]
+    return {
+        'games': n,
+        'mean': float(mean),
+        'ci_low': float(mean - half_width),
+        'ci_high': float(mean + half_width),
+        'percentiles': {'10': p10, '25': p25, '50': p50, '75': p75, '90': p90},
+        'max': float(scores.max()),
+        'survival': survival,
+    }
+
+
+def separated(stats):
+    """
+    Check whether the confidence intervals of every policy's mean score are
+    apart from each other, so the ranking of the policies is settled.
+
+    Arguments:
+        stats (dict): summaries from summarize(), by policy name
+
+    Returns:
+        bool: True if no two intervals overlap
+    """
+    intervals = sorted((s['ci_low'], s['ci_high']) for s in stats.values())
+    return all(a[1] < b[0] for a, b in zip(intervals, intervals[1:]))
+
+
+class Tournament():
+
+    def __init__(self, policies, seeds, levels=(0, 1, 2), max_frames=9000,
+                 processes=None, min_games=30, z=1.96):
+        """
+        Initialize a tournament between policies.
+
+        Every policy plays the same games: one for each seed on each level.
+        Games are spread across a pool of worker processes, each of which runs
+        the game simulation itself, so the results follow the exact same
+        rules as the game.
+
+        Games finish out of order, and short games finish first, so results
+        only count once every game of their seed (on every level, with every
+        policy) is done, along with every game of the seeds before it. The
+        statistics are always over the same first seeds for every policy.
+
+        Arguments:
+            policies (dict): policy callables, by name
+            seeds (list): seeds for the pipe placement
+            levels (list): game difficulties to play, as [0,1,2] = [easy,
+                medium, or hard]
+            max_frames (int): longest a game can run (in frames), so a policy
+                that never crashes still finishes
+            processes (int): number of worker processes. Defaults to the
+                number of CPU cores.
+            min_games (int): number of games each policy has to play before
+                the tournament can stop early
+            z (float): z-score of the confidence intervals (1.96 for 95%)
+        """
+        self.policies = policies
+        self.seeds = list(seeds)
+        self.levels = list(levels)
+        self.max_frames = max_frames
+        self.processes = processes
+        self.min_games = min_games
+        self.z = z
+
+        # Games counted so far, by policy name: every game of the first few
+        # seeds
+        self.finished = {name: [] for name in policies}
+
+        # Games done but not counted yet, by seed, and the number of seeds
+        # counted
+        self.waiting = {}
+        self.seeds_done = 0
+
+        # Whether or not the tournament stopped before playing every game
+        self.stopped_early = False
+
+
+    def tasks(self):
+        """
+        Get the games to play. The policies take turns, so the games finished
+        at any point are spread evenly across them.
+
+        Returns:
+            list: tasks for play()
+        """
+        return [(name, policy, level, seed, self.max_frames)
+                for seed in self.seeds
+                for level in self.levels
+                for name, policy in self.policies.items()]
+
+
+    def results(self):
+        """
+        Play the games, handing out each result as soon as it's done.
+        Once every policy has played min_games counted games and their
+        confidence intervals no longer overlap, the remaining games are
+        cancelled.
+
+        Yields:
+            dict: game result from play()
+        """
+        self.stopped_early = False
+        with mp.Pool(self.processes) as pool:
+            for result in pool.imap_unordered(play, self.tasks()):
+                self.waiting.setdefault(result['seed'], []).append(result)
+                yield result
+                if self.count_seeds() and self.decided():
+                    self.stopped_early = True
+                    break
+
+
+    def count_seeds(self):
+        """
+        Count the games of the seeds that are complete, in seed order.
+
+        Returns:
+            bool: True if any new games were counted
+        """
+        block_size = len(self.levels) * len(self.policies)
+        counted = False
+        while self.seeds_done < len(self.seeds):
+            seed = self.seeds[self.seeds_done]
+            if len(self.waiting.get(seed, [])) < block_size:
+                break
+            for game in self.waiting.pop(seed):
+                self.finished[game['policy']].append(game)
+            self.seeds_done += 1
+            counted = True
+        return counted
+
+
+    def decided(self):
+        """
+        Check whether the ranking of the policies is settled.
+
+        Returns:
+            bool: True if every policy has played enough games and their
+                confidence intervals are apart
+        """
+        if len(self.policies) < 2:
+            return False
+        if min(len(games) for games in self.finished.values()) < self.min_games:
+            return False
+        return separated(self.stats())
+
+
+    def stats(self, level=None):
+        """
+        Get the score statistics of each policy so far, over the games
+        counted.
+
+        Arguments:
+            level (int): optionally only count games on this level
+
+        Returns:
+            dict: summaries from summarize(), by policy name
+        """
+        stats = {}
+        for name, games in self.finished.items():
+            if level is not None:
+                games = [g for g in games if g['level'] == level]
+            if games:
+                stats[name] = summarize(games, self.max_frames, self.z)
+        return stats
+
+
+    def run(self):
+        """
+        Play the whole tournament.
+
+        Returns:
+            dict: statistics of each policy, over all levels ('all') and on
+                each level
+        """
+        for result in self.results():
+            pass
+        return self.report()
+
+
+    def report(self):
+        """
+        Get the statistics of each policy so far.
+
+        Returns:
+            dict: statistics of each policy, over all levels ('all') and on
+                each level
+        """
+        report = {'all': self.stats()}
+        for level in self.levels:
+            report[level] = self.stats(level)
+        return report
+
+
+def load_policy(path):
+    """
+    Import a policy from a 'module:function' path.
+
+    Arguments:
+        path (str): module and function name, e.g. 'benchmark:scripted_policy'
+
+    Returns:
+        callable: the policy
+    """
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+# Script entry point
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flappy Bird policy tournament')
+    parser.add_argument('policies', nargs='+', help='policies, as module:function')
+    parser.add_argument('--seeds', type=int, default=200, help='seeds per level')
+    parser.add_argument('--levels', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--max-frames', type=int, default=9000)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--min-games', type=int, default=30)
+    args = parser.parse_args()
+
+    tournament = Tournament({path: load_policy(path) for path in args.policies},
+                            range(args.seeds), args.levels, args.max_frames,
+                            args.processes, args.min_games)
+    total = len(tournament.tasks())
+    for i, result in enumerate(tournament.results()):
+        print('[%i/%i] %s level %i seed %i: score %i' % (
+            i + 1, total, result['policy'], result['level'], result['seed'],
+            result['score']), file=sys.stderr)
+    if tournament.stopped_early:
+        print('Stopped early: confidence intervals are apart', file=sys.stderr)
+
+    print(json.dumps(tournament.report(), indent=2))
@@ -1,37 +1,16 @@
-import sys
 import pygame
 from pygame.locals import *
 
 
-def listen():
+def allow_events():
     """
-    Listen and log key presses from user (spacebar, arrow keys). 
-    Will automatically exit game if it gets a quit signal.
-
-    Returns:
-        list (str): a list of the names of the keys pressed
+    Only let the events the game uses into the event queue: key presses, the
+    quit signal, and the window being uncovered (so it can be redrawn).
+    Everything else (mouse motion, key releases, ...) is dropped by pygame
+    before it's queued.
     """
-    keypress = []
-
-    for event in pygame.event.get():
-
-        # If spacebar is pressed
-        if event.type == KEYDOWN and event.key == K_SPACE:
-            keypress.append('spacebar')
-
-        # If arrows pressed
-        if event.type == KEYDOWN and event.key == K_RIGHT:
-            keypress.append('right_arrow')
-
-        if event.type == KEYDOWN and event.key == K_LEFT:
-            keypress.append('left_arrow')
-
-        # If quit triggered
-        if event.type == QUIT:
-            pygame.quit()
-            sys.exit()
-
-    return keypress
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([QUIT, KEYDOWN, WINDOWEXPOSED])
 
 
  
@@ -0,0 +1,287 @@
+import multiprocessing as mp
+import random
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from env import FlappyBirdEnv
+
+
+# Arrays shared between the workers and the main process, as
+# (name, dtype, values per game)
+SHARED_ARRAYS = [
+    ('observations', np.float32, FlappyBirdEnv.observation_size),
+    ('rewards', np.float32, 1),
+    ('dones', np.bool_, 1),
+    ('scores', np.int64, 1),
+    ('actions', np.int8, 1),
+]
+
+
+def shared_arrays(buffer, num_envs):
+    """
+    Lay out the shared arrays over a block of shared memory.
+
+    Arguments:
+        buffer (memoryview): the shared memory (or an array of its bytes), or
+            None to just measure it
+        num_envs (int): total number of games
+
+    Returns:
+        tuple: (dict of NumPy arrays by name, total size in bytes)
+    """
+    arrays = {}
+    offset = 0
+    for name, dtype, size in SHARED_ARRAYS:
+        shape = (num_envs, size) if size > 1 else (num_envs,)
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if buffer is not None:
+            arrays[name] = np.ndarray(shape, dtype, buffer, offset)
+        # Keep every array 8-byte aligned
+        offset += -(-nbytes // 8) * 8
+    return arrays, offset
+
+
+class SharedBlock():
+
+    def __init__(self, shm, size):
+        """
+        Initialize the owner of a block of shared memory, which keeps the
+        block mapped for as long as any array laid over it is in use.
+
+        Arrays of the block are made from this object (through its array
+        interface), so they hold a reference to it, and the block is only
+        unmapped once the last of them is garbage collected. This way arrays
+        handed out by the vector env stay valid after it's closed.
+
+        Arguments:
+            shm (shared_memory.SharedMemory): the shared memory
+            size (int): size of the block in bytes
+        """
+        self.shm = shm
+
+        # Address of the memory. The temporary array is dropped straight
+        # away, so it doesn't stop the block from being closed later.
+        address = np.frombuffer(shm.buf, np.uint8, size).ctypes.data
+        self.__array_interface__ = {
+            'shape': (size,), 'typestr': '|u1', 'data': (address, False),
+            'version': 3}
+
+
+    def __del__(self):
+        self.shm.close()
+
+
+def worker(conn, shm_name, num_envs, start, stop, level, frame_skip, seed):
+    """
+    Run a slice of the games in a worker process.
+
+    Commands come in over the pipe, and results are written straight into
+    shared memory. Only a short reply goes back over the pipe once a command
+    is done: None on success, or the error message.
+
+    Arguments:
+        conn (multiprocessing.Connection): pipe to the main process
+        shm_name (str): name of the shared memory block
+        num_envs (int): total number of games
+        start (int): index of the first game run by this worker
+        stop (int): index after the last game run by this worker
+        level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+        frame_skip (int): number of game frames each step lasts
+        seed (int): base seed for the pipe placement
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays, _ = shared_arrays(shm.buf, num_envs)
+    envs = [FlappyBirdEnv(level, frame_skip) for i in range(start, stop)]
+
+    # Each game draws the seeds of its episodes from its own stream
+    seeds = [random.Random(None if seed is None else seed + i)
+             for i in range(start, stop)]
+
+    def reset(j):
+        arrays['observations'][start + j] = envs[j].reset(seeds[j].getrandbits(32))
+
+    try:
+        while True:
+            command = conn.recv()
+            try:
+                if command == 'reset':
+                    for j in range(len(envs)):
+                        reset(j)
+                    arrays['rewards'][start:stop] = 0
+                    arrays['dones'][start:stop] = False
+                    arrays['scores'][start:stop] = 0
+                elif command == 'step':
+                    for j, env in enumerate(envs):
+                        i = start + j
+                        obs, reward, done, info = env.step(arrays['actions'][i])
+                        arrays['rewards'][i] = reward
+                        arrays['dones'][i] = done
+                        arrays['scores'][i] = info['score']
+
+                        # Finished games are restarted straight away
+                        if done:
+                            reset(j)
+                        else:
+                            arrays['observations'][i] = obs
+                elif command == 'close':
+                    conn.send(None)
+                    break
+                conn.send(None)
+            except Exception:
+                conn.send(traceback.format_exc())
+    finally:
+        del arrays
+        shm.close()
+
+
+class SubprocVectorEnv():
+
+    def __init__(self, num_envs, num_workers=None, level=2, frame_skip=1,
+                 seed=None):
+        """
+        Initialize a set of games spread across worker processes.
+
+        Each worker runs several games. Actions, observations, rewards and
+        done flags live in shared memory, so stepping never pickles any game
+        data; only a short command goes to each worker.
+
+        Arguments:
+            num_envs (int): total number of games
+            num_workers (int): number of worker processes. Defaults to the
+                number of CPU cores.
+            level (int): game difficulty as [0,1,2] = [easy, medium, or hard]
+            frame_skip (int): number of game frames each step lasts
+            seed (int): base seed, for reproducible pipe placement
+        """
+        self.num_envs = num_envs
+        if num_workers is None:
+            num_workers = mp.cpu_count()
+        num_workers = max(1, min(num_workers, num_envs))
+        self.waiting = False
+        self.closed = False
+
+        # Shared memory for the actions and results of every game
+        _, size = shared_arrays(None, num_envs)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays, _ = shared_arrays(np.asarray(SharedBlock(self.shm, size)), num_envs)
+
+        # Start the workers, giving each a contiguous slice of the games
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.conns = []
+        self.processes = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=worker, daemon=True, args=(
+                child_conn, self.shm.name, num_envs, int(start), int(stop),
+                level, frame_skip, seed))
+            process.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+
+
+    def send(self, command):
+        """
+        Send a command to every worker.
+
+        Arguments:
+            command (str): one of 'reset', 'step' or 'close'
+        """
+        for conn in self.conns:
+            conn.send(command)
+
+
+    def wait(self):
+        """
+        Wait for every worker to finish its command.
+        """
+        errors = [conn.recv() for conn in self.conns]
+        errors = [e for e in errors if e is not None]
+        if errors:
+            raise RuntimeError('Worker failed:\n' + errors[0])
+
+
+    def reset(self):
+        """
+        Start new games in every slot.
+
+        Returns:
+            np.ndarray: (num_envs, observation_size) shared observations
+        """
+        self.send('reset')
+        self.wait()
+        return self.arrays['observations']
+
+
+    def step_async(self, actions):
+        """
+        Start stepping every game, without waiting for the results.
+
+        Arguments:
+            actions (np.ndarray): action of each game (1 = flap)
+        """
+        self.arrays['actions'][:] = actions
+        self.send('step')
+        self.waiting = True
+
+
+    def step_wait(self):
+        """
+        Wait for the step started by step_async() to finish.
+
+        The returned arrays are views of the shared memory, and get
+        overwritten by the next step. Copy them to keep them around. They
+        stay readable after the env is closed.
+
+        Returns:
+            tuple: (observations, rewards, dones, scores) arrays. Games that
+            are done have already been restarted, and their observation is
+            the first one of the new game.
+        """
+        self.wait()
+        self.waiting = False
+        a = self.arrays
+        return a['observations'], a['rewards'], a['dones'], a['scores']
+
+
+    def step(self, actions):
+        """
+        Step every game and wait for the results (see step_wait()).
+
+        Arguments:
+            actions (np.ndarray): action of each game (1 = flap)
+
+        Returns:
+            tuple: (observations, rewards, dones, scores) arrays
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory. The memory is unmapped
+        once the arrays handed out by reset() and step() are no longer used.
+        """
+        if self.closed:
+            return
+        if self.waiting:
+            self.wait()
+        self.send('close')
+        self.wait()
+        for process in self.processes:
+            process.join()
+        self.arrays = None
+        self.shm.unlink()
+        self.shm = None
+        self.closed = True
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()